@@ -1,15 +1,19 @@
 
-import base64
+import itertools
 import json
 import logging
 import os
+import struct
 import threading
 import time
 from datetime import datetime, timezone
 
 from flask import Flask, jsonify, render_template, request
 from flask_cors import CORS
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit, join_room, leave_room
+
+from emit_scheduler import EmitScheduler
+from history_buffer import HistoryBuffer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +26,10 @@ app.config["SECRET_KEY"] = os.environ.get("FLASK_SECRET", "liberty-twin-secret-k
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 
+EMIT_INTERVAL = float(os.environ.get("DASHBOARD_EMIT_INTERVAL", 0.25))
+emitter = EmitScheduler(socketio, EMIT_INTERVAL)
+_alert_keys = itertools.count()
+
 state = {
     "sensors": {},
     "zones": {},
@@ -36,12 +44,14 @@ state = {
         "utilization": 0.0,
     },
     "camera_frames": {},
-    "history": [],
 }
 state_lock = threading.Lock()
 
 HISTORY_MAX = 3600
+HISTORY_MAX_POINTS = 720
+HISTORY_FIELDS = ("occupied", "empty", "ghost", "suspected", "total")
 
+history = HistoryBuffer(HISTORY_MAX, HISTORY_FIELDS)
 _last_history_ts = 0
 
 def _maybe_record_history():
@@ -50,33 +60,330 @@ def _maybe_record_history():
     if now - _last_history_ts < 5:
         return
     _last_history_ts = now
-    point = {
-        "ts": datetime.now(timezone.utc).isoformat(),
-        "occupied": state["stats"]["occupied"],
-        "empty": state["stats"]["empty"],
-        "ghost": state["stats"]["ghost"],
-        "suspected": state["stats"]["suspected"],
-        "total": state["stats"]["occupied"] + state["stats"]["empty"]
-                 + state["stats"]["ghost"] + state["stats"]["suspected"],
-    }
-    state["history"].append(point)
-    if len(state["history"]) > HISTORY_MAX:
-        state["history"] = state["history"][-HISTORY_MAX:]
+    stats = state["stats"]
+    history.append(now, {
+        **stats,
+        "total": stats["occupied"] + stats["empty"] + stats["ghost"] + stats["suspected"],
+    })
+
+COUNTED_STATES = ("occupied", "empty", "ghost", "suspected")
+CHECK_COUNTERS = os.environ.get("DASHBOARD_CHECK_COUNTERS", "").lower() in ("1", "true", "yes")
 
-def _recompute_stats():
-    counts = {"occupied": 0, "empty": 0, "ghost": 0, "suspected": 0}
+_state_counts = dict.fromkeys(COUNTED_STATES, 0)
+_zone_counts = {}
+
+def _count_seat(seat, step):
+    seat_state = seat.get("state", "empty")
+    if seat_state not in _state_counts:
+        return
+    _state_counts[seat_state] += step
+    zone_counts = _zone_counts.get(seat.get("zone", ""))
+    if zone_counts is None:
+        zone_counts = _zone_counts[seat.get("zone", "")] = dict.fromkeys(COUNTED_STATES, 0)
+    zone_counts[seat_state] += step
+
+def _check_counters():
+    counts = dict.fromkeys(COUNTED_STATES, 0)
+    zone_counts = {}
     for seat in state["seats"].values():
-        s = seat.get("state", "empty")
-        if s in counts:
-            counts[s] += 1
-    total = sum(counts.values()) or 1
-    state["stats"].update(counts)
-    state["stats"]["utilization"] = round(counts["occupied"] / total * 100, 1)
+        seat_state = seat.get("state", "empty")
+        if seat_state in counts:
+            counts[seat_state] += 1
+            zone_counts.setdefault(seat.get("zone", ""), dict.fromkeys(COUNTED_STATES, 0))[seat_state] += 1
+    tracked = {zone_name: c for zone_name, c in _zone_counts.items() if any(c.values())}
+    if counts != _state_counts or zone_counts != tracked:
+        raise AssertionError(
+            f"Seat counters out of sync: {_state_counts} {tracked}, recount {counts} {zone_counts}"
+        )
+
+def _refresh_stats():
+    if CHECK_COUNTERS:
+        _check_counters()
+    total = sum(_state_counts.values()) or 1
+    state["stats"].update(_state_counts)
+    state["stats"]["utilization"] = round(_state_counts["occupied"] / total * 100, 1)
     _maybe_record_history()
 
+def _zone_summary(zone_name, zone_seats):
+    counts = dict(_zone_counts.get(zone_name) or dict.fromkeys(COUNTED_STATES, 0))
+    return {
+        "name": zone_name,
+        "occupied": counts["occupied"],
+        "total": len(zone_seats),
+        "counts": counts,
+        "seats": zone_seats,
+    }
+
 mqtt_client = None
 mqtt_connected = False
 
+SNAPSHOT_TOPIC = "liberty_twin/state/snapshot"
+SNAPSHOT_FIELDS = {
+    "zone": "zone_id",
+    "occupancy": "occupancy_score",
+    "confidence": "confidence",
+    "radar_presence": "radar_presence",
+    "object_type": "object_type",
+    "present": "is_present",
+    "motion": "has_motion",
+    "updated": "timestamp",
+}
+SNAPSHOT_RESYNC_MIN_INTERVAL = 2.0
+
+CAMERA_MAGIC = b"LTC"
+CAMERA_HEADER = struct.Struct("<3sBH")
+CAMERA_BINARY_TYPES = ("application/octet-stream", "image/jpeg")
+
+_seat_seq = {}
+_zone_seq = {}
+_edge_epoch = None
+_last_resync = 0.0
+
+FLOOR_ZONES = json.loads(os.environ.get("DASHBOARD_FLOORS", "{}"))
+ZONE_FLOOR = {zone_name: floor for floor, zone_names in FLOOR_ZONES.items() for zone_name in zone_names}
+DEFAULT_FLOOR = os.environ.get("DASHBOARD_DEFAULT_FLOOR", "main")
+CAMERA_ZONES = json.loads(os.environ.get(
+    "DASHBOARD_CAMERA_ZONES",
+    '{"back_rail": ["Z1", "Z2", "Z3", "Z4"], "front_rail": ["Z5", "Z6", "Z7"]}',
+))
+
+SCOPED_EVENTS = ("telemetry", "seat_delta", "sensor_status", "ghost_alert", "camera_frame")
+GLOBAL_EVENTS = ("stats",)
+EVENT_ALIASES = {"seat_state": "seat_delta"}
+
+_seat_version = 0
+_seat_versions = {}
+_scope_version = {}
+_scope_epoch = {}
+_room_cache = {}
+_client_subs = {}
+_room_members = {}
+_emit_lock = threading.Lock()
+
+def _zone_scopes(zone_names):
+    scopes = ["all"]
+    for zone_name in zone_names:
+        if not zone_name:
+            continue
+        for scope in ("zone/" + zone_name, "floor/" + ZONE_FLOOR.get(zone_name, DEFAULT_FLOOR)):
+            if scope not in scopes:
+                scopes.append(scope)
+    return scopes
+
+def _in_scope(zone_name, scope):
+    if scope == "all":
+        return True
+    kind, _, name = scope.partition("/")
+    if kind == "zone":
+        return zone_name == name
+    return bool(zone_name) and ZONE_FLOOR.get(zone_name, DEFAULT_FLOOR) == name
+
+def _sensor_zones(sensor_id):
+    return CAMERA_ZONES.get(sensor_id) or [state["sensors"].get(sensor_id, {}).get("zone", "")]
+
+def _alert_zone(alert):
+    return alert.get("zone") or state["seats"].get(alert.get("seat_id"), {}).get("zone", "")
+
+def _scoped(name, data, key, zone_names, touch=True):
+    scopes = _zone_scopes(zone_names)
+    if touch:
+        for scope in scopes:
+            _scope_epoch[scope] = _scope_epoch.get(scope, 0) + 1
+    return (name, data, key, scopes)
+
+def _merge_seat(sid, seat):
+    previous = state["seats"].get(sid)
+    merged = {**(previous or {}), **seat}
+    if merged == previous:
+        return False
+    if previous is None:
+        _count_seat(merged, 1)
+    elif previous.get("state") != merged.get("state") or previous.get("zone") != merged.get("zone"):
+        _count_seat(previous, -1)
+        _count_seat(merged, 1)
+    state["seats"][sid] = merged
+    return True
+
+def _seat_delta_events(changed):
+    global _seat_version
+    if not changed:
+        return []
+    _seat_version += 1
+    by_scope = {}
+    for sid in changed:
+        _seat_versions[sid] = _seat_version
+        for scope in _zone_scopes([state["seats"][sid].get("zone", "")]):
+            by_scope.setdefault(scope, {})[sid] = state["seats"][sid]
+    events = []
+    for scope, seats in by_scope.items():
+        delta = {
+            "scope": scope,
+            "version": _seat_version,
+            "base": _scope_version.get(scope, 0),
+            "seats": seats,
+        }
+        events.append(("seat_delta", delta, None, [scope]))
+        _scope_version[scope] = _seat_version
+        _scope_epoch[scope] = _scope_epoch.get(scope, 0) + 1
+    return events
+
+def _seats_since(version, scope):
+    top = _scope_version.get(scope, 0)
+    wanted = [sid for sid, seat in state["seats"].items() if _in_scope(seat.get("zone", ""), scope)]
+    if version <= 0 or version > top:
+        return {
+            "versions": {scope: top},
+            "full": True,
+            "seats": {sid: state["seats"][sid] for sid in wanted},
+        }
+    return {
+        "scope": scope,
+        "version": top,
+        "base": version,
+        "seats": {sid: state["seats"][sid] for sid in wanted if _seat_versions.get(sid, 0) > version},
+    }
+
+def _zone_event(zone_name):
+    zone = state["zones"][zone_name]
+    return _scoped("telemetry", {
+        "zone": zone_name,
+        "zone_data": {**zone, "seats": dict(zone["seats"])},
+        "stats": dict(state["stats"]),
+    }, zone_name, [zone_name])
+
+def _scope_snapshot(scope):
+    epoch = _scope_epoch.get(scope, 0)
+    cached = _room_cache.get(scope)
+    if cached is not None and cached[0] == epoch:
+        return cached[1]
+    snapshot = {
+        "version": _scope_version.get(scope, 0),
+        "seats": {
+            sid: seat for sid, seat in state["seats"].items()
+            if _in_scope(seat.get("zone", ""), scope)
+        },
+        "telemetry": {
+            zone_name: {
+                "zone": zone_name,
+                "zone_data": {**zone, "seats": dict(zone["seats"])},
+            }
+            for zone_name, zone in state["zones"].items() if _in_scope(zone_name, scope)
+        },
+        "sensors": {
+            sid: {"sensor_id": sid, **sdata} for sid, sdata in state["sensors"].items()
+            if any(_in_scope(zone_name, scope) for zone_name in _sensor_zones(sid))
+        },
+        "alerts": [alert for alert in state["alerts"] if _in_scope(_alert_zone(alert), scope)][:20],
+    }
+    _room_cache[scope] = (epoch, snapshot)
+    return snapshot
+
+def _merge_seat_deltas(older, newer):
+    return {
+        "scope": newer["scope"],
+        "version": newer["version"],
+        "base": older["base"],
+        "seats": {**older["seats"], **newer["seats"]},
+    }
+
+def _emit_events(events):
+    for name, data, key, scopes in events:
+        rooms = [name] if scopes is None else [f"{name}:{scope}" for scope in scopes]
+        rooms = [room for room in rooms if _room_members.get(room)]
+        if not rooms:
+            continue
+        if name == "seat_delta":
+            for room in rooms:
+                emitter.emit(name, data, key=key, to=room, merge=_merge_seat_deltas)
+        else:
+            emitter.emit(name, data, key=key, to=rooms[0] if len(rooms) == 1 else tuple(rooms))
+
+def _subscription(data):
+    data = data or {}
+    scopes = ["zone/" + str(z) for z in data.get("zones") or []]
+    scopes += ["floor/" + str(f) for f in data.get("floors") or []]
+    events = [EVENT_ALIASES.get(e, e) for e in data.get("events") or SCOPED_EVENTS + GLOBAL_EVENTS]
+    events = [e for e in dict.fromkeys(events) if e in SCOPED_EVENTS + GLOBAL_EVENTS]
+    if not scopes:
+        return ["all"], events
+    floors = {scope[len("floor/"):] for scope in scopes if scope.startswith("floor/")}
+    scopes = [
+        scope for scope in dict.fromkeys(scopes)
+        if not (scope.startswith("zone/") and ZONE_FLOOR.get(scope[len("zone/"):], DEFAULT_FLOOR) in floors)
+    ]
+    return scopes, events
+
+def _subscription_rooms(scopes, events):
+    return {
+        event if event in GLOBAL_EVENTS else f"{event}:{scope}"
+        for event in events for scope in scopes
+    }
+
+def _release_room(room):
+    _room_members[room] -= 1
+    if _room_members[room] <= 0:
+        del _room_members[room]
+
+def _subscribe(sid, scopes, events):
+    rooms = _subscription_rooms(scopes, events)
+    with state_lock:
+        previous = _client_subs.get(sid)
+        old_rooms = _subscription_rooms(*previous) if previous else set()
+        _client_subs[sid] = (scopes, events)
+        for room in old_rooms - rooms:
+            _release_room(room)
+        for room in rooms - old_rooms:
+            _room_members[room] = _room_members.get(room, 0) + 1
+    for room in old_rooms - rooms:
+        leave_room(room)
+    for room in rooms - old_rooms:
+        join_room(room)
+
+def _unsubscribe(sid):
+    with state_lock:
+        previous = _client_subs.pop(sid, None)
+        for room in _subscription_rooms(*previous) if previous else ():
+            _release_room(room)
+
+def _send_initial_state(scopes, events):
+    with _emit_lock:
+        with state_lock:
+            snapshots = [_scope_snapshot(scope) for scope in scopes]
+            stats = dict(state["stats"])
+            frames = [
+                (sid, frame) for sid, frame in state["camera_frames"].items()
+                if any(_in_scope(zone_name, scope) for scope in scopes for zone_name in _sensor_zones(sid))
+            ]
+        seats = {}
+        telemetry = {}
+        sensors = {}
+        alerts = []
+        for snapshot in snapshots:
+            seats.update(snapshot["seats"])
+            telemetry.update(snapshot["telemetry"])
+            sensors.update(snapshot["sensors"])
+            alerts.extend(alert for alert in snapshot["alerts"] if alert not in alerts)
+        if "seat_delta" in events:
+            emit("seat_state", {
+                "versions": {scope: snapshot["version"] for scope, snapshot in zip(scopes, snapshots)},
+                "full": True,
+                "seats": seats,
+            })
+    if "telemetry" in events:
+        for zone_data in telemetry.values():
+            emit("telemetry", {**zone_data, "stats": stats})
+    if "stats" in events:
+        emit("stats", stats)
+    if "sensor_status" in events:
+        for sensor in sensors.values():
+            emit("sensor_status", sensor)
+    if "ghost_alert" in events:
+        for alert in alerts[:20]:
+            emit("ghost_alert", alert)
+    if "camera_frame" in events:
+        for sid, frame in frames:
+            emit("camera_frame", {"sensor_id": sid, "image": frame})
+
 def _start_mqtt():
     global mqtt_client, mqtt_connected
     try:
@@ -92,6 +399,7 @@ def _start_mqtt():
             client.subscribe("liberty_twin/state/#")
             client.subscribe("liberty_twin/alerts/#")
             client.subscribe("liberty_twin/sensor/+/camera")
+            client.subscribe("liberty_twin/sensor/+/camera/raw")
 
         def on_disconnect(client, userdata, flags, reason_code, properties=None):
             global mqtt_connected
@@ -101,21 +409,20 @@ def _start_mqtt():
         def on_message(client, userdata, msg):
             topic = msg.topic
             try:
-                if topic.endswith("/camera"):
+                if topic.endswith("/camera") or topic.endswith("/camera/raw"):
                     parts = topic.split("/")
-                    sensor_id = parts[2] if len(parts) >= 4 else "unknown"
-                    frame_b64 = base64.b64encode(msg.payload).decode("ascii")
-                    with state_lock:
-                        state["camera_frames"][sensor_id] = frame_b64
-                    socketio.emit("camera_frame", {
-                        "sensor_id": sensor_id,
-                        "image": frame_b64,
-                    })
+                    meta, frame = _split_camera_payload(msg.payload)
+                    props = getattr(msg, "properties", None)
+                    meta.update(dict(getattr(props, "UserProperty", None) or []))
+                    sensor_id = meta.get("sensor") or (parts[2] if len(parts) >= 4 else "unknown")
+                    _store_camera_frame(sensor_id, frame)
                     return
 
                 payload = json.loads(msg.payload.decode())
 
-                if topic.startswith("liberty_twin/state/"):
+                if topic == SNAPSHOT_TOPIC:
+                    _handle_snapshot_message(payload)
+                elif topic.startswith("liberty_twin/state/"):
                     _handle_state_message(topic, payload)
                 elif topic.startswith("liberty_twin/alerts/"):
                     _handle_alert_message(topic, payload)
@@ -138,44 +445,143 @@ def _start_mqtt():
     except Exception as exc:
         log.warning("MQTT not available, running in HTTP-only mode: %s", exc)
 
-def _handle_state_message(topic, payload):
+def _request_snapshot():
+    global _last_resync
+    now = time.time()
+    if mqtt_client is None or not mqtt_connected or now - _last_resync < SNAPSHOT_RESYNC_MIN_INTERVAL:
+        return
+    _last_resync = now
+    log.info("Sequence gap detected; re-fetching state snapshot")
+    mqtt_client.unsubscribe(SNAPSHOT_TOPIC)
+    mqtt_client.subscribe(SNAPSHOT_TOPIC)
+
+def _rebuild_zone(zone_name):
+    zone_seats = {
+        sid: s for sid, s in state["seats"].items() if s.get("zone") == zone_name
+    }
+    state["zones"][zone_name] = _zone_summary(zone_name, zone_seats)
+
+def _accept_epoch(epoch):
+    global _edge_epoch
+    if epoch is None or epoch == _edge_epoch:
+        return True
+    if _edge_epoch is not None and epoch < _edge_epoch:
+        return False
+    if _edge_epoch is not None:
+        log.info("Edge restarted (epoch %s -> %s); resetting sequence numbers", _edge_epoch, epoch)
+    _edge_epoch = epoch
+    _seat_seq.clear()
+    _zone_seq.clear()
+    return True
+
+def _handle_snapshot_message(payload):
+    columns = payload.get("seats", {})
+    states = payload.get("states", [])
+    touched = set()
+    changed = []
+    events = []
+    with _emit_lock:
+        with state_lock:
+            if not _accept_epoch(payload.get("epoch")):
+                log.info("Ignoring state snapshot from a previous edge run")
+                return
+            for i, sid in enumerate(columns.get("id", [])):
+                seq = columns["seq"][i]
+                if seq < _seat_seq.get(sid, 0):
+                    continue
+                code = columns["state"][i]
+                seat = {
+                    "id": sid,
+                    "state": states[code] if 0 <= code < len(states) else "empty",
+                    "seq": seq,
+                }
+                for column, field in SNAPSHOT_FIELDS.items():
+                    if column in columns:
+                        seat[field] = columns[column][i]
+                seat["zone"] = seat.get("zone_id", "")
+                if _merge_seat(sid, seat):
+                    changed.append(sid)
+                _seat_seq[sid] = seq
+                touched.add(seat["zone"])
+
+            for zone_name, seq in payload.get("zones", {}).items():
+                _zone_seq[zone_name] = max(seq, _zone_seq.get(zone_name, 0))
+            for zone_name in touched:
+                _rebuild_zone(zone_name)
+            _refresh_stats()
+
+            events.extend(_zone_event(zone_name) for zone_name in touched)
+            events.append(("stats", dict(state["stats"]), None, None))
+            events.extend(_seat_delta_events(changed))
+        _emit_events(events)
+    log.info("Applied state snapshot #%s (%d seats)", payload.get("seq"), len(columns.get("id", [])))
+
+def _split_camera_payload(payload):
+    if payload[:3] != CAMERA_MAGIC or len(payload) < CAMERA_HEADER.size:
+        return {}, bytes(payload)
+    _magic, _version, meta_len = CAMERA_HEADER.unpack_from(payload)
+    end = CAMERA_HEADER.size + meta_len
+    meta = json.loads(payload[CAMERA_HEADER.size:end].decode("utf-8")) if meta_len else {}
+    return meta, bytes(payload[end:])
+
+def _store_camera_frame(sensor_id, image):
     with state_lock:
-        if "sensor_id" in payload:
-            sid = payload["sensor_id"]
-            state["sensors"][sid] = {
-                "status": payload.get("status", "online"),
-                "zone": payload.get("zone", ""),
-                "last_seen": datetime.now(timezone.utc).isoformat(),
-            }
-            socketio.emit("sensor_status", {
-                "sensor_id": sid,
-                **state["sensors"][sid],
-            })
-
-        if "zone" in payload and "seats" in payload:
-            zone_name = payload["zone"]
-            seats_data = payload["seats"]
-            state["zones"][zone_name] = {
-                "name": zone_name,
-                "occupied": sum(1 for s in seats_data if s.get("state") == "occupied"),
-                "total": len(seats_data),
-                "seats": {s["id"]: s for s in seats_data},
-            }
-            for s in seats_data:
-                state["seats"][s["id"]] = {**s, "zone": zone_name}
-
-            _recompute_stats()
-            state["stats"]["total_scans"] = state["stats"].get("total_scans", 0) + 1
+        state["camera_frames"][sensor_id] = image
+        event = _scoped(
+            "camera_frame", {"sensor_id": sensor_id, "image": image}, sensor_id,
+            _sensor_zones(sensor_id), touch=False,
+        )
+    _emit_events([event])
 
-            socketio.emit("telemetry", {
-                "zone": zone_name,
-                "zone_data": state["zones"][zone_name],
-                "stats": state["stats"],
-            })
-            socketio.emit("stats", state["stats"])
-            socketio.emit("seat_state", {
-                "seats": {sid: sdata for sid, sdata in state["seats"].items()},
-            })
+def _handle_state_message(topic, payload):
+    events = []
+    with _emit_lock:
+        with state_lock:
+            if "sensor_id" in payload:
+                sid = payload["sensor_id"]
+                state["sensors"][sid] = {
+                    "status": payload.get("status", "online"),
+                    "zone": payload.get("zone", ""),
+                    "last_seen": datetime.now(timezone.utc).isoformat(),
+                }
+                events.append(_scoped("sensor_status", {
+                    "sensor_id": sid,
+                    **state["sensors"][sid],
+                }, sid, _sensor_zones(sid)))
+
+            if "zone" in payload and "seats" in payload and _accept_epoch(payload.get("epoch")):
+                zone_name = payload["zone"]
+                seats_data = payload["seats"]
+                if "seq" in payload:
+                    last = _zone_seq.get(zone_name)
+                    if last is not None and payload["seq"] > last + 1:
+                        _request_snapshot()
+                    _zone_seq[zone_name] = max(payload["seq"], last or 0)
+                seats_data = [
+                    s for s in seats_data
+                    if "seq" not in s or s["seq"] > _seat_seq.get(s["id"], 0)
+                ]
+                for s in seats_data:
+                    if "seq" in s:
+                        _seat_seq[s["id"]] = s["seq"]
+                if payload.get("delta") and zone_name in state["zones"]:
+                    zone_seats = dict(state["zones"][zone_name]["seats"])
+                    for s in seats_data:
+                        zone_seats[s["id"]] = {**zone_seats.get(s["id"], {}), **s}
+                else:
+                    zone_seats = {s["id"]: s for s in seats_data}
+                changed = [
+                    s["id"] for s in seats_data if _merge_seat(s["id"], {**s, "zone": zone_name})
+                ]
+                state["zones"][zone_name] = _zone_summary(zone_name, zone_seats)
+
+                _refresh_stats()
+                state["stats"]["total_scans"] = state["stats"].get("total_scans", 0) + 1
+
+                events.append(_zone_event(zone_name))
+                events.append(("stats", dict(state["stats"]), None, None))
+                events.extend(_seat_delta_events(changed))
+        _emit_events(events)
 
 def _handle_alert_message(topic, payload):
     with state_lock:
@@ -191,8 +597,9 @@ def _handle_alert_message(topic, payload):
         }
         state["alerts"].insert(0, alert)
         state["alerts"] = state["alerts"][:200]
+        event = _scoped("ghost_alert", alert, next(_alert_keys), [_alert_zone(alert)])
 
-    socketio.emit("ghost_alert", alert)
+    _emit_events([event])
 
 @app.route("/")
 def index():
@@ -206,12 +613,22 @@ def api_telemetry():
 
 @app.route("/api/camera", methods=["POST"])
 def api_camera():
+    if request.mimetype in CAMERA_BINARY_TYPES:
+        meta, frame = _split_camera_payload(request.get_data())
+        sensor_id = meta.get("sensor") or request.args.get("sensor_id", "unknown")
+        _store_camera_frame(sensor_id, frame)
+        return jsonify({"status": "ok"})
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("image")
+        if upload is None:
+            return jsonify({"error": "no image part"}), 400
+        _store_camera_frame(request.form.get("sensor_id", "unknown"), upload.read())
+        return jsonify({"status": "ok"})
+
     payload = request.get_json(force=True)
     sensor_id = payload.get("sensor_id", "unknown")
     image_b64 = payload.get("image", "")
-    with state_lock:
-        state["camera_frames"][sensor_id] = image_b64
-    socketio.emit("camera_frame", {"sensor_id": sensor_id, "image": image_b64})
+    _store_camera_frame(sensor_id, image_b64)
     return jsonify({"status": "ok"})
 
 @app.route("/api/status", methods=["POST"])
@@ -224,7 +641,8 @@ def api_status():
             "zone": payload.get("zone", ""),
             "last_seen": datetime.now(timezone.utc).isoformat(),
         }
-    socketio.emit("sensor_status", {"sensor_id": sid, **state["sensors"][sid]})
+        event = _scoped("sensor_status", {"sensor_id": sid, **state["sensors"][sid]}, sid, _sensor_zones(sid))
+    _emit_events([event])
     return jsonify({"status": "ok"})
 
 @app.route("/api/alert", methods=["POST"])
@@ -233,9 +651,18 @@ def api_alert():
     _handle_alert_message("liberty_twin/alerts/http", payload)
     return jsonify({"status": "ok"})
 
+def _history_params(minutes, max_points):
+    return max(1, int(minutes)), max(1, int(max_points))
+
 @app.route("/api/history", methods=["GET"])
 def api_history():
-    minutes = int(request.args.get("minutes", 60))
+    try:
+        minutes, max_points = _history_params(
+            request.args.get("minutes", 60),
+            request.args.get("max_points", HISTORY_MAX),
+        )
+    except (TypeError, ValueError):
+        return jsonify({"error": "minutes and max_points must be integers"}), 400
 
     try:
         from influxdb_client import InfluxDBClient
@@ -256,51 +683,104 @@ def api_history():
                   |> filter(fn: (r) => r._measurement == "occupancy")
                   |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
                   |> sort(columns: ["_time"])
+            """
+            points = []
+            for table in query_api.query(query):
+                for record in table.records:
+                    point = {"ts": record.get_time().isoformat()}
+                    for key, value in record.values.items():
+                        if not key.startswith("_") and key not in ("result", "table"):
+                            point[key] = value
+                    points.append(point)
+            client.close()
+            return jsonify(points)
+    except Exception as exc:
+        log.warning("InfluxDB history query failed, using in-memory history: %s", exc)
+
+    columns = history.query(
+        since=time.time() - minutes * 60,
+        max_points=max_points,
+    )
+    if request.args.get("format") == "columns":
+        return jsonify(columns)
+    return jsonify([
+        {
+            "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+            **{name: columns[name][i] for name in HISTORY_FIELDS},
+        }
+        for i, ts in enumerate(columns["ts"])
+    ])
+
+@app.route("/api/state", methods=["GET"])
+def api_state():
     with state_lock:
         return jsonify({
+            "seat_version": _seat_version,
+            "emit": emitter.stats,
+            "rooms": {room: n for room, n in _room_members.items() if n},
             "sensors": state["sensors"],
             "zones": state["zones"],
             "seats": state["seats"],
             "stats": state["stats"],
+            "zone_counts": _zone_counts,
             "alerts": state["alerts"][:20],
             "camera_frames": {
-                k: v[:40] + "..." if v else ""
+                k: f"<{len(v)} bytes>" if isinstance(v, bytes) else (v[:40] + "..." if v else "")
                 for k, v in state["camera_frames"].items()
             },
         })
 
 @socketio.on("connect")
-def handle_connect():
-    log.info("Browser client connected")
-    with state_lock:
-        socketio.emit("stats", state["stats"])
-        socketio.emit("seat_state", {"seats": state["seats"]})
-        for zone_name, zone_data in state["zones"].items():
-            socketio.emit("telemetry", {
-                "zone": zone_name,
-                "zone_data": zone_data,
-                "stats": state["stats"],
-            })
-        for sid, sdata in state["sensors"].items():
-            socketio.emit("sensor_status", {"sensor_id": sid, **sdata})
-        for alert in state["alerts"][:20]:
-            socketio.emit("ghost_alert", alert)
-        for sid, frame in state["camera_frames"].items():
-            socketio.emit("camera_frame", {"sensor_id": sid, "image": frame})
+def handle_connect(auth=None):
+    scopes, events = _subscription(auth)
+    log.info("Browser client connected (%s)", ", ".join(scopes))
+    _subscribe(request.sid, scopes, events)
+    _send_initial_state(scopes, events)
+
+@socketio.on("subscribe")
+def handle_subscribe(data):
+    scopes, events = _subscription(data)
+    _subscribe(request.sid, scopes, events)
+    _send_initial_state(scopes, events)
+
+@socketio.on("request_seat_resync")
+def handle_seat_resync(data):
+    data = data or {}
+    version = int(data.get("version", 0) or 0)
+    scope = data.get("scope", "all")
+    if scope not in _client_subs.get(request.sid, (["all"], ()))[0]:
+        return
+    with _emit_lock:
+        with state_lock:
+            reply = _seats_since(version, scope)
+        emitter.emit(
+            "seat_state" if reply.get("full") else "seat_delta",
+            reply,
+            to=request.sid,
+            merge=_merge_seat_deltas if not reply.get("full") else None,
+        )
+
+@socketio.on("disconnect")
+def handle_disconnect(*args):
+    _unsubscribe(request.sid)
+    emitter.discard(request.sid)
 
 @socketio.on("request_history")
 def handle_history_request(data):
-    minutes = data.get("minutes", 60) if data else 60
-    with state_lock:
-        cutoff = time.time() - minutes * 60
-        history = [
-            p for p in state["history"]
-            if datetime.fromisoformat(p["ts"]).timestamp() > cutoff
-        ]
-    socketio.emit("history_data", history)
+    data = data or {}
+    try:
+        minutes, max_points = _history_params(
+            data.get("minutes", 60),
+            data.get("max_points", HISTORY_MAX_POINTS),
+        )
+    except (TypeError, ValueError):
+        log.warning("Ignoring history request with invalid parameters: %s", data)
+        return
+    emit("history_data", history.query(since=time.time() - minutes * 60, max_points=max_points))
 
 if __name__ == "__main__":
     _start_mqtt()
+    emitter.start()
     port = int(os.environ.get("PORT", 5000))
     log.info("Starting Liberty Twin Dashboard on port %s", port)
     socketio.run(app, host="0.0.0.0", port=port, debug=True, allow_unsafe_werkzeug=True)
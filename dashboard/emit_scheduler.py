@@ -0,0 +1,78 @@
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger("liberty-twin-dashboard.emit")
+
+class EmitScheduler:
+
+    def __init__(self, socketio, interval=0.25):
+        self.socketio = socketio
+        self.interval = interval
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "queued": 0,
+            "coalesced": 0,
+            "emitted": 0,
+            "flushes": 0,
+        }
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="emit-scheduler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 4 + 1)
+            self._thread = None
+        self.flush()
+
+    def emit(self, event, data, key=None, to=None, merge=None):
+        if self._thread is None:
+            self._send(event, data, to)
+            return
+        slot = (to, event, key)
+        with self._lock:
+            self.stats["queued"] += 1
+            previous = self._pending.get(slot)
+            if previous is not None:
+                self.stats["coalesced"] += 1
+                if merge is not None:
+                    data = merge(previous, data)
+            self._pending[slot] = data
+
+    def discard(self, to):
+        with self._lock:
+            for slot in [slot for slot in self._pending if slot[0] == to]:
+                del self._pending[slot]
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, OrderedDict()
+            self.stats["flushes"] += 1
+        for (to, event, _key), data in pending.items():
+            self._send(event, data, to)
+        return len(pending)
+
+    def _send(self, event, data, to):
+        try:
+            if to is None:
+                self.socketio.emit(event, data)
+            else:
+                self.socketio.emit(event, data, to=to)
+            self.stats["emitted"] += 1
+        except Exception as exc:
+            log.warning("Socket.IO emit of %s failed: %s", event, exc)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
@@ -0,0 +1,74 @@
+import threading
+from array import array
+
+class HistoryBuffer:
+
+    def __init__(self, capacity, fields):
+        if capacity <= 0:
+            raise ValueError(f"History capacity must be positive, got {capacity!r}")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._ts = array("d", bytes(8 * capacity))
+        self._columns = {name: array("l", [0]) * capacity for name in self.fields}
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def append(self, ts, values):
+        with self._lock:
+            if self._size == self.capacity:
+                i = self._start
+                self._start = (self._start + 1) % self.capacity
+            else:
+                i = (self._start + self._size) % self.capacity
+                self._size += 1
+            self._ts[i] = ts
+            for name, column in self._columns.items():
+                column[i] = int(values.get(name, 0))
+
+    def latest(self):
+        with self._lock:
+            if not self._size:
+                return None
+            i = (self._start + self._size - 1) % self.capacity
+            return {"ts": self._ts[i], **{name: column[i] for name, column in self._columns.items()}}
+
+    def _bisect(self, ts):
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts[(self._start + mid) % self.capacity] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _slice(self, column, lo, hi, step):
+        start = self._start + lo
+        end = self._start + hi
+        if end <= self.capacity:
+            return column[start:end:step]
+        if start >= self.capacity:
+            return column[start - self.capacity:end - self.capacity:step]
+        head = column[start::step]
+        skip = (step - (self.capacity - start) % step) % step
+        return head + column[skip:end - self.capacity:step]
+
+    def query(self, since=None, until=None, max_points=None):
+        if max_points is not None:
+            max_points = max(1, int(max_points))
+        with self._lock:
+            lo = 0 if since is None else self._bisect(since)
+            hi = self._size if until is None else self._bisect(until)
+            count = max(hi - lo, 0)
+            step = 1
+            if max_points and count > max_points:
+                step = -(-count // max_points)
+                lo = hi - 1 - (count - 1) // step * step
+            result = {"ts": self._slice(self._ts, lo, hi, step).tolist()} if count else {"ts": []}
+            for name, column in self._columns.items():
+                result[name] = self._slice(column, lo, hi, step).tolist() if count else []
+        return result
@@ -24,12 +24,22 @@
         "Zone H - Entrance",
     ];
 
-    const socket = io({ transports: ["websocket", "polling"] });
+    const params = new URLSearchParams(window.location.search);
+    const listParam = (name) => (params.get(name) || "").split(",").filter(Boolean);
+    const subscription = {
+        zones:  listParam("zones"),
+        floors: listParam("floors"),
+        events: listParam("events"),
+    };
+
+    const socket = io({ transports: ["websocket", "polling"], auth: subscription });
 
     socket.on("connect", () => {
+        awaitingSeatState = true;
+        resyncPending.clear();
         setConnectionStatus(true);
         console.log("[Dashboard] Connected to server");
-        socket.emit("request_history", { minutes: 60 });
+        socket.emit("request_history", { minutes: 60, max_points: HISTORY_POINTS_MAX });
     });
 
     socket.on("disconnect", () => {
@@ -57,6 +67,9 @@
     };
 
     let seats = {};
+    let seatVersions = {};
+    let resyncPending = new Set();
+    let awaitingSeatState = true;
     let zones = {};
     let alertCount = 0;
     let historyChart = null;
@@ -79,6 +92,7 @@
         socket.on("ghost_alert",   handleGhostAlert);
         socket.on("stats",         handleStats);
         socket.on("seat_state",    handleSeatState);
+        socket.on("seat_delta",    handleSeatDelta);
         socket.on("history_data",  handleHistoryData);
     }
 
@@ -143,7 +157,17 @@
     function handleCameraFrame(data) {
         const imgEl = dom.cameraImg[data.sensor_id];
         if (imgEl && data.image) {
-            imgEl.src = "data:image/jpeg;base64," + data.image;
+            if (imgEl.dataset.objectUrl) {
+                URL.revokeObjectURL(imgEl.dataset.objectUrl);
+                delete imgEl.dataset.objectUrl;
+            }
+            if (typeof data.image === "string") {
+                imgEl.src = "data:image/jpeg;base64," + data.image;
+            } else {
+                const url = URL.createObjectURL(new Blob([data.image], { type: "image/jpeg" }));
+                imgEl.dataset.objectUrl = url;
+                imgEl.src = url;
+            }
             imgEl.style.display = "block";
             const placeholder = imgEl.parentElement.querySelector(".camera-placeholder");
             if (placeholder) placeholder.style.display = "none";
@@ -181,7 +205,12 @@
         const total = zoneData.total || 0;
 
         let dominantState = "empty";
-        if (zoneData.seats) {
+        if (zoneData.counts) {
+            const counts = zoneData.counts;
+            if (counts.ghost > 0)          dominantState = "ghost";
+            else if (counts.suspected > 0) dominantState = "suspected";
+            else if (counts.occupied > 0)  dominantState = "occupied";
+        } else if (zoneData.seats) {
             const counts = { empty: 0, occupied: 0, suspected: 0, ghost: 0 };
             const seatValues = typeof zoneData.seats === "object"
                 ? Object.values(zoneData.seats) : zoneData.seats;
@@ -458,11 +487,7 @@
     function addHistoryPoint(point) {
         if (!historyChart) return;
         const labels = historyChart.data.labels;
-        const ts = new Date(point.ts).toLocaleTimeString("en-US", {
-            hour12: false, hour: "2-digit", minute: "2-digit", second: "2-digit",
-        });
-
-        labels.push(ts);
+        labels.push(formatHistoryTime(new Date(point.ts)));
         historyChart.data.datasets[0].data.push(point.occupied || 0);
         historyChart.data.datasets[1].data.push(point.empty || 0);
         historyChart.data.datasets[2].data.push(point.ghost || 0);
@@ -475,20 +500,28 @@
         historyChart.update("none");
     }
 
-    function handleHistoryData(data) {
-        if (!historyChart || !Array.isArray(data)) return;
-        historyChart.data.labels = [];
-        historyChart.data.datasets.forEach((ds) => (ds.data = []));
-
-        data.forEach((point) => {
-            const ts = new Date(point.ts).toLocaleTimeString("en-US", {
-                hour12: false, hour: "2-digit", minute: "2-digit", second: "2-digit",
-            });
-            historyChart.data.labels.push(ts);
-            historyChart.data.datasets[0].data.push(point.occupied || 0);
-            historyChart.data.datasets[1].data.push(point.empty || 0);
-            historyChart.data.datasets[2].data.push(point.ghost || 0);
+    function formatHistoryTime(date) {
+        return date.toLocaleTimeString("en-US", {
+            hour12: false, hour: "2-digit", minute: "2-digit", second: "2-digit",
         });
+    }
+
+    function handleHistoryData(data) {
+        if (!historyChart || !data) return;
+
+        if (Array.isArray(data)) {
+            historyChart.data.labels = data.map((point) => formatHistoryTime(new Date(point.ts)));
+            historyChart.data.datasets[0].data = data.map((point) => point.occupied || 0);
+            historyChart.data.datasets[1].data = data.map((point) => point.empty || 0);
+            historyChart.data.datasets[2].data = data.map((point) => point.ghost || 0);
+        } else if (Array.isArray(data.ts)) {
+            historyChart.data.labels = data.ts.map((ts) => formatHistoryTime(new Date(ts * 1000)));
+            historyChart.data.datasets[0].data = data.occupied.slice();
+            historyChart.data.datasets[1].data = data.empty.slice();
+            historyChart.data.datasets[2].data = data.ghost.slice();
+        } else {
+            return;
+        }
 
         historyChart.update();
     }
@@ -512,15 +545,44 @@
         }
     }
 
-    function handleSeatState(data) {
-        if (!data.seats) return;
-        seats = data.seats;
-        Object.entries(seats).forEach(([id, sdata]) => {
+    function applySeats(changed) {
+        Object.entries(changed).forEach(([id, sdata]) => {
+            seats[id] = sdata;
             updateSeatDot(id, sdata);
             updateRadarBar(id, sdata);
         });
     }
 
+    function handleSeatState(data) {
+        if (!data.seats) return;
+        applySeats(data.seats);
+        Object.entries(data.versions || {}).forEach(([scope, version]) => {
+            seatVersions[scope] = version;
+            resyncPending.delete(scope);
+        });
+        awaitingSeatState = false;
+    }
+
+    function handleSeatDelta(data) {
+        if (!data.seats || awaitingSeatState) return;
+        const scope = data.scope || "all";
+        const current = seatVersions[scope] || 0;
+        if (data.version <= current) return;
+        if (data.base > current) {
+            requestSeatResync(scope);
+            return;
+        }
+        applySeats(data.seats);
+        seatVersions[scope] = data.version;
+        resyncPending.delete(scope);
+    }
+
+    function requestSeatResync(scope) {
+        if (resyncPending.has(scope)) return;
+        resyncPending.add(scope);
+        socket.emit("request_seat_resync", { scope: scope, version: seatVersions[scope] || 0 });
+    }
+
     function handleStats(data) {
         if (!data) return;
         animateNumber(dom.statOccupied, data.occupied || 0);
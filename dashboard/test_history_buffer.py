@@ -0,0 +1,33 @@
+import pytest
+
+from app import app
+from history_buffer import HistoryBuffer
+
+def _buffer(n):
+    buffer = HistoryBuffer(8, ("total",))
+    for i in range(n):
+        buffer.append(float(i), {"total": i})
+    return buffer
+
+@pytest.mark.parametrize("max_points", [0, -3])
+def test_query_clamps_max_points(max_points):
+    result = _buffer(5).query(max_points=max_points)
+
+    assert result["ts"] == [4.0]
+    assert result["total"] == [4]
+
+def test_query_downsamples_wrapped_buffer():
+    result = _buffer(11).query(max_points=2)
+
+    assert result["total"] == [6, 10]
+
+@pytest.mark.parametrize("query, status", [
+    ("minutes=5&max_points=-3", 200),
+    ("minutes=5&max_points=0", 200),
+    ("minutes=5&max_points=abc", 400),
+    ("minutes=x", 400),
+])
+def test_api_history_validates_max_points(query, status):
+    response = app.test_client().get(f"/api/history?{query}")
+
+    assert response.status_code == status
@@ -0,0 +1,108 @@
+import base64
+import io
+import json
+import logging
+import zlib
+from typing import List, Sequence
+
+from config import INGEST_MAX_BYTES, INGEST_MAX_RECORDS
+from telemetry_codec import TelemetryBatch, decode_telemetry
+
+logger = logging.getLogger("batch_ingest")
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+class IngestError(ValueError):
+    pass
+
+class UnsupportedEncodingError(IngestError):
+    pass
+
+def supported_encodings() -> List[str]:
+    encodings = ["identity", "gzip", "deflate"]
+    if _zstd is not None:
+        encodings.append("zstd")
+    return encodings
+
+def _inflate(raw: bytes, wbits: int, max_bytes: int) -> bytes:
+    chunks = []
+    size = 0
+    while raw:
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(raw, max_bytes + 1 - size)
+        except zlib.error as exc:
+            raise IngestError(f"Corrupt compressed body: {exc}") from exc
+        size += len(data)
+        if size > max_bytes or decompressor.unconsumed_tail:
+            raise IngestError(f"Decompressed body exceeds {max_bytes} bytes")
+        chunks.append(data)
+        raw = decompressor.unused_data if decompressor.eof and wbits > zlib.MAX_WBITS else b""
+    return b"".join(chunks)
+
+def _unzstd(raw: bytes, max_bytes: int) -> bytes:
+    reader = _zstd.ZstdDecompressor().stream_reader(io.BytesIO(raw), read_across_frames=True)
+    chunks = []
+    size = 0
+    while size <= max_bytes:
+        chunk = reader.read(max_bytes + 1 - size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks)
+
+def decompress_body(raw: bytes, encoding: str, max_bytes: int = INGEST_MAX_BYTES) -> bytes:
+    encoding = (encoding or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        data = raw
+    elif encoding in ("gzip", "x-gzip"):
+        data = _inflate(raw, 16 + zlib.MAX_WBITS, max_bytes)
+    elif encoding == "deflate":
+        data = _inflate(raw, zlib.MAX_WBITS, max_bytes)
+    elif encoding == "zstd" and _zstd is not None:
+        try:
+            data = _unzstd(raw, max_bytes)
+        except _zstd.ZstdError as exc:
+            raise IngestError(f"Corrupt compressed body: {exc}") from exc
+    else:
+        raise UnsupportedEncodingError(
+            f"Unsupported Content-Encoding {encoding!r}; supported: {', '.join(supported_encodings())}"
+        )
+
+    if len(data) > max_bytes:
+        raise IngestError(f"Decompressed body exceeds {max_bytes} bytes")
+    return data
+
+def parse_records(body: bytes, max_records: int = INGEST_MAX_RECORDS) -> List[dict]:
+    try:
+        records = json.loads(body)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise IngestError(f"Invalid JSON body: {exc}") from exc
+    if isinstance(records, dict):
+        records = records.get("records")
+    if not isinstance(records, list):
+        raise IngestError("Body must be a JSON array of records or {\"records\": [...]}")
+    if len(records) > max_records:
+        raise IngestError(f"Too many records ({len(records)} > {max_records})")
+    return records
+
+def telemetry_from_record(record: dict) -> TelemetryBatch:
+    if record.get("format") == "binary":
+        return decode_telemetry(base64.b64decode(record.get("data", "")))
+    return TelemetryBatch.from_json(record)
+
+def telemetry_waves(batches: Sequence[TelemetryBatch]) -> List[List[TelemetryBatch]]:
+    waves: List[List[TelemetryBatch]] = []
+    seen = set()
+    for batch in batches:
+        seats = set(batch.seat_ids)
+        if not waves or seen & seats or len(seats) != len(batch.seat_ids):
+            waves.append([])
+            seen = set()
+        waves[-1].append(batch)
+        seen |= seats
+    return waves
@@ -0,0 +1,40 @@
+import json
+import struct
+from typing import Optional, Tuple
+
+CAMERA_MAGIC = b"LTC"
+CAMERA_VERSION = 1
+
+_HEADER = struct.Struct("<3sBH")
+HEADER_SIZE = _HEADER.size
+
+class CameraDecodeError(ValueError):
+    pass
+
+def encode_camera_frame(frame_bytes: bytes, sensor: str, timestamp: Optional[float] = None, **meta) -> bytes:
+    meta = {"sensor": sensor, **meta}
+    if timestamp is not None:
+        meta["timestamp"] = timestamp
+    raw_meta = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(CAMERA_MAGIC, CAMERA_VERSION, len(raw_meta)) + raw_meta + frame_bytes
+
+def decode_camera_frame(payload: bytes) -> Tuple[dict, bytes]:
+    if payload[:3] != CAMERA_MAGIC:
+        return {}, payload
+    if len(payload) < HEADER_SIZE:
+        raise CameraDecodeError("Camera header truncated")
+    _magic, version, meta_len = _HEADER.unpack_from(payload)
+    if version != CAMERA_VERSION:
+        raise CameraDecodeError(f"Unsupported camera frame version {version}")
+    end = HEADER_SIZE + meta_len
+    if len(payload) < end:
+        raise CameraDecodeError("Camera metadata truncated")
+    try:
+        meta = json.loads(payload[HEADER_SIZE:end].decode("utf-8")) if meta_len else {}
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise CameraDecodeError(f"Invalid camera metadata: {exc}") from exc
+    return meta, payload[end:]
+
+def meta_from_user_properties(properties) -> dict:
+    pairs = getattr(properties, "UserProperty", None) or []
+    return {str(key): value for key, value in pairs}
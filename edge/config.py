@@ -3,12 +3,25 @@ MQTT_BROKER_HOST = "localhost"
 MQTT_BROKER_PORT = 1883
 MQTT_CLIENT_ID = "liberty_twin_edge"
 MQTT_KEEPALIVE = 60
+MQTT_USE_V5 = False
 
 MQTT_TOPIC_SENSOR = "liberty_twin/sensor/#"
 MQTT_TOPIC_TELEMETRY = "liberty_twin/sensor/{rail}/telemetry"
+MQTT_TOPIC_TELEMETRY_BINARY = "liberty_twin/sensor/{rail}/telemetry/bin"
 MQTT_TOPIC_CAMERA = "liberty_twin/sensor/{rail}/camera"
+MQTT_TOPIC_CAMERA_RAW = "liberty_twin/sensor/{rail}/camera/raw"
 MQTT_TOPIC_STATE_SEAT = "liberty_twin/state/seat/{seat_id}"
+MQTT_TOPIC_STATE_ZONE = "liberty_twin/state/zone/{zone_id}"
+MQTT_TOPIC_STATE_SNAPSHOT = "liberty_twin/state/snapshot"
 MQTT_TOPIC_ALERTS_GHOST = "liberty_twin/alerts/ghost"
+MQTT_TOPIC_CONTROL_CAMERA = "liberty_twin/control/{rail}/camera"
+MQTT_TELEMETRY_BINARY_SUFFIX = "/telemetry/bin"
+TELEMETRY_BINARY_CONTENT_TYPE = "application/vnd.liberty-twin.telemetry"
+MQTT_CAMERA_RAW_SUFFIX = "/camera/raw"
+CAMERA_BINARY_CONTENT_TYPES = ("application/octet-stream", "image/jpeg")
+
+INGEST_MAX_RECORDS = 5000
+INGEST_MAX_BYTES = 32 * 1024 * 1024
 
 INFLUXDB_URL = "http://localhost:8086"
 INFLUXDB_TOKEN = "liberty-twin-token"
@@ -17,6 +30,8 @@ INFLUXDB_BUCKET = "iot_data"
 
 GHOST_GRACE_PERIOD = 120
 GHOST_THRESHOLD = 300
+GHOST_SEAT_CAPACITY = 1024
+GHOST_TICK_INTERVAL = 1.0
 PRESENCE_THRESHOLD = 0.6
 MOTION_THRESHOLD = 0.15
 
@@ -41,7 +56,29 @@ for _zone, _seats in ZONE_TO_SEATS.items():
 
 TOTAL_SEATS = 28
 
+CAMERA_FRAME_SIZE = (640, 480)
+CAMERA_SEAT_MAP_FILE = "seat_map.json"
+CAMERA_ZONES = {
+    "back": ["Z1", "Z2", "Z3", "Z4"],
+    "front": ["Z5", "Z6", "Z7"],
+}
+SEAT_INDEX_CELL = 0.1
+
+CAMERA_SEAT_POLYGONS = {}
+for _cam, _zones in CAMERA_ZONES.items():
+    _col_w = 1.0 / len(_zones)
+    _top = 0.25
+    CAMERA_SEAT_POLYGONS[_cam] = {}
+    for _col, _zone in enumerate(_zones):
+        _seats = ZONE_TO_SEATS[_zone]
+        _row_h = (1.0 - _top) / len(_seats)
+        for _row, _seat in enumerate(_seats):
+            _x0, _x1 = _col * _col_w, (_col + 1) * _col_w
+            _y0, _y1 = _top + _row * _row_h, _top + (_row + 1) * _row_h
+            CAMERA_SEAT_POLYGONS[_cam][_seat] = [(_x0, _y0), (_x1, _y0), (_x1, _y1), (_x0, _y1)]
+
 HTTP_FALLBACK_PORT = 5001
+HTTP_MAX_BODY_BYTES = 16 * 1024 * 1024
 
 YOLO_MODEL = "yolov8n.pt"
 YOLO_CONFIDENCE = 0.35
@@ -61,5 +98,80 @@ YOLO_CLASSES_OF_INTEREST = {
     73: "book",
 }
 
+DETECTOR_BACKEND = "auto"
+DETECTOR_ONNX_MODEL = "yolov8n_int8.onnx"
+DETECTOR_INPUT_SIZE = 640
+DETECTOR_NMS_IOU = 0.45
+DETECTOR_THREADS = 1
+
+FRAME_DECODE_TURBOJPEG = True
+FRAME_DECODE_CONTOUR_SIZE = 320
+
+INFERENCE_BATCH_SIZE = 4
+INFERENCE_MAX_WAIT = 0.05
+INFERENCE_MAX_PENDING = 32
+
+DETECTION_WORKERS = 3
+DETECTION_START_METHOD = "spawn"
+
+FRAME_RING_SLOTS = 16
+FRAME_RING_SLOT_BYTES = 512 * 1024
+
+FRAME_GATE_ENABLED = True
+FRAME_GATE_SIZE = (32, 24)
+FRAME_GATE_BLOCK = 4
+FRAME_GATE_THRESHOLD = 8.0
+FRAME_GATE_MAX_AGE = 60.0
+
+TRACKER_ENABLED = True
+TRACKER_DETECT_EVERY = 5
+TRACKER_IOU_THRESHOLD = 0.3
+TRACKER_MAX_MISSED = 3
+TRACKER_CONFIDENCE_DECAY = 0.85
+TRACKER_MIN_CONFIDENCE = 0.5
+
+SAMPLING_ENABLED = True
+SAMPLING_IDLE_INTERVAL = 30.0
+SAMPLING_WATCH_INTERVAL = 5.0
+SAMPLING_URGENT_INTERVAL = 1.0
+SAMPLING_LEAD_TIME = 30.0
+
+INFLUX_BATCH_SIZE = 500
+INFLUX_FLUSH_INTERVAL = 1.0
+INFLUX_QUEUE_SIZE = 20000
+INFLUX_OVERFLOW_POLICY = "drop_oldest"
+INFLUX_MAX_RETRIES = 5
+INFLUX_RETRY_BASE = 0.5
+INFLUX_RETRY_MAX = 30.0
+
+SPOOL_ENABLED = True
+SPOOL_DIR = "spool"
+SPOOL_SEGMENT_BYTES = 4 * 1024 * 1024
+SPOOL_MAX_BYTES = 256 * 1024 * 1024
+SPOOL_FSYNC_INTERVAL = 1.0
+SPOOL_REPLAY_INTERVAL = 10.0
+SPOOL_REPLAY_BATCH = 5000
+
+RECORDING_POLICY_ENABLED = True
+RECORD_HEARTBEAT_INTERVAL = 300.0
+RECORD_EXACT_FIELDS = ("state", "object_type", "is_present", "has_motion")
+RECORD_DEADBANDS = {
+    "occupancy_score": 0.05,
+    "confidence": 0.05,
+    "radar_presence": 0.05,
+    "radar_motion": 0.05,
+}
+
+STATE_PUBLISH_QOS = 1
+STATE_PUBLISH_PER_SEAT = False
+STATE_PUBLISH_ZONE_BATCH = True
+STATE_PUBLISH_DEADBANDS = {
+    "occupancy_score": 0.02,
+    "confidence": 0.02,
+    "radar_presence": 0.02,
+    "radar_motion": 0.02,
+}
+STATE_SNAPSHOT_INTERVAL = 10.0
+
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
@@ -0,0 +1,117 @@
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple, Union
+
+import detector
+from config import DETECTION_WORKERS, DETECTION_START_METHOD, LOG_LEVEL, LOG_FORMAT
+from frame_ring import FrameRing, read_slot
+from inference_scheduler import FrameJob
+
+logger = logging.getLogger("detection_pool")
+
+def _init_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO), format=LOG_FORMAT)
+    detector.init_object_detector()
+
+def _worker_backend() -> Tuple[str, str]:
+    return detector.active_backend(), detector.describe_backend()
+
+def _detect_batch(
+    ring_name: Optional[str],
+    slot_size: int,
+    items: List[Tuple[str, Optional[bytes], int, int]],
+) -> List[List[dict]]:
+    frames = []
+    for sensor_name, frame_bytes, slot, length in items:
+        if frame_bytes is None:
+            frame_bytes = read_slot(ring_name, slot_size, slot, length)
+        frames.append((sensor_name, frame_bytes))
+    return detector.detect_objects_in_batch(frames)
+
+class DetectionPool:
+
+    def __init__(self, workers: int = DETECTION_WORKERS, start_method: str = DETECTION_START_METHOD):
+        self.workers = max(0, workers)
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._ring: Optional[FrameRing] = None
+        self._backend: Tuple[str, str] = ("threshold", "threshold-only fallback")
+
+    @property
+    def is_pooled(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        if self.workers == 0:
+            detector.init_object_detector()
+            self._backend = _worker_backend()
+            logger.info("Detection running in-process (%s)", self._backend[1])
+            return
+
+        try:
+            ctx = multiprocessing.get_context(self.start_method)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+            )
+            self._backend = self._executor.submit(_worker_backend).result()
+            try:
+                self._ring = FrameRing()
+            except Exception as exc:
+                logger.warning("Shared-memory frame ring unavailable (%s). Frames will be pickled.", exc)
+            logger.info("Detection pool started: %d %s workers (%s)",
+                        self.workers, self.start_method, self._backend[1])
+        except Exception as exc:
+            logger.warning("Cannot start detection pool (%s). Running detection in-process.", exc)
+            self._executor = None
+            detector.init_object_detector()
+            self._backend = _worker_backend()
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    @property
+    def ring_stats(self) -> Optional[dict]:
+        if self._ring is None:
+            return None
+        return {**self._ring.stats, "free_slots": self._ring.free_slots()}
+
+    def stage(self, sensor_name: str, frame_bytes: bytes) -> FrameJob:
+        ring = self._ring
+        if ring is not None:
+            ref = ring.write(frame_bytes)
+            if ref is not None:
+                return FrameJob(sensor_name, slot=ref[0], length=ref[1])
+        return FrameJob(sensor_name, frame_bytes=frame_bytes, length=len(frame_bytes))
+
+    def release(self, job: FrameJob):
+        if job.slot >= 0 and self._ring is not None:
+            self._ring.release(job.slot)
+            job.slot = -1
+
+    def active_backend(self) -> str:
+        return self._backend[0]
+
+    def describe_backend(self) -> str:
+        return self._backend[1]
+
+    def submit(self, jobs: Sequence[FrameJob]) -> Union[List[List[dict]], Future]:
+        if self._executor is None:
+            return detector.detect_objects_in_batch([(j.sensor_name, j.frame_bytes) for j in jobs])
+        ring = self._ring
+        items = [(j.sensor_name, j.frame_bytes, j.slot, j.length) for j in jobs]
+        return self._executor.submit(
+            _detect_batch,
+            ring.name if ring is not None else None,
+            ring.slot_size if ring is not None else 0,
+            items,
+        )
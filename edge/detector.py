@@ -0,0 +1,381 @@
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    YOLO_MODEL,
+    YOLO_CONFIDENCE,
+    YOLO_CLASSES_OF_INTEREST,
+    DETECTOR_BACKEND,
+    DETECTOR_ONNX_MODEL,
+    DETECTOR_INPUT_SIZE,
+    DETECTOR_NMS_IOU,
+    DETECTOR_THREADS,
+    FRAME_DECODE_CONTOUR_SIZE,
+)
+from frame_decoder import FrameDecoder, BufferPool
+
+logger = logging.getLogger("detector")
+
+_backend = None
+_fallback_contour = None
+_cv2 = None
+
+class DetectorBackend:
+    name = "base"
+    description = "base"
+
+    def detect_batch(self, frames: Sequence[Tuple[str, bytes]]) -> List[Optional[List[dict]]]:
+        return [self.detect(frame_bytes, sensor_name) for sensor_name, frame_bytes in frames]
+
+    def detect(self, frame_bytes: bytes, sensor_name: str) -> Optional[List[dict]]:
+        raise NotImplementedError
+
+class ThresholdBackend(DetectorBackend):
+    name = "threshold"
+    description = "threshold-only fallback"
+
+    def detect(self, frame_bytes: bytes, sensor_name: str) -> Optional[List[dict]]:
+        detections = []
+        try:
+            nparr = np.frombuffer(frame_bytes, np.uint8)
+            mean_val = float(np.mean(nparr))
+            if mean_val > 60:
+                detections.append({
+                    "class": "object",
+                    "confidence": round(min(1.0, mean_val / 180), 3),
+                    "bbox": [0, 0, 0, 0],
+                })
+            logger.debug("Threshold fallback: mean=%.1f, detections=%d", mean_val, len(detections))
+        except Exception as exc:
+            logger.warning("Threshold detection failed: %s", exc)
+
+        return detections
+
+class ContourBackend(DetectorBackend):
+    name = "opencv"
+
+    def __init__(self, cv2):
+        self.cv2 = cv2
+        self.description = f"OpenCV ({cv2.__version__})"
+        self.decoder = FrameDecoder(cv2, target_side=FRAME_DECODE_CONTOUR_SIZE, grayscale=True)
+        self.buffers = BufferPool()
+
+    def detect(self, frame_bytes: bytes, sensor_name: str) -> Optional[List[dict]]:
+        cv2 = self.cv2
+        detections = []
+        try:
+            gray, scale = self.decoder.decode(frame_bytes)
+            if gray is None:
+                return detections
+            blur_k = _odd(11 * scale)
+            block = _odd(25 * scale)
+            blurred = cv2.GaussianBlur(gray, (blur_k, blur_k), 0,
+                                       dst=self.buffers.get("blur", gray.shape))
+            thresh = cv2.adaptiveThreshold(
+                blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY_INV, block, 8,
+                dst=self.buffers.get("thresh", gray.shape),
+            )
+            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            h, w = gray.shape[:2]
+            min_area = (h * w) * 0.01
+
+            for cnt in contours:
+                area = cv2.contourArea(cnt)
+                if area < min_area:
+                    continue
+                x, y, bw, bh = cv2.boundingRect(cnt)
+                aspect = bh / max(bw, 1)
+                fill_ratio = area / max(bw * bh, 1)
+                conf = min(1.0, (area / (h * w)) * 3)
+                if aspect > 1.5 and fill_ratio > 0.3:
+                    label = "person"
+                    conf = min(1.0, conf * 1.2)
+                elif area > min_area * 2:
+                    label = "object"
+                else:
+                    label = "unknown"
+
+                detections.append({
+                    "class": label,
+                    "confidence": round(conf, 3),
+                    "bbox": [int(round(v / scale)) for v in (x, y, x + bw, y + bh)],
+                })
+
+            logger.debug("OpenCV detected %d contours from %s", len(detections), sensor_name)
+            return detections
+        except Exception as exc:
+            logger.warning("OpenCV detection failed (%s).", exc)
+            return None
+
+class UltralyticsBackend(DetectorBackend):
+    name = "yolo"
+    description = "YOLOv8-nano"
+
+    def __init__(self, model_path: str = YOLO_MODEL):
+        from ultralytics import YOLO
+        self.decoder = FrameDecoder(_require_cv2(), target_side=DETECTOR_INPUT_SIZE)
+        self.model = YOLO(model_path)
+
+    def detect_batch(self, frames: Sequence[Tuple[str, bytes]]) -> List[Optional[List[dict]]]:
+        results: List[Optional[List[dict]]] = [[] for _ in frames]
+        images, scales, slots = _decode_frames(self.decoder, frames)
+        if images:
+            batch_results = self.model(images, conf=YOLO_CONFIDENCE, verbose=False)
+            for i, scale, r in zip(slots, scales, batch_results):
+                results[i] = self._to_detections(r, scale)
+                logger.debug("YOLO detected %d objects from %s", len(results[i]), frames[i][0])
+        return results
+
+    @staticmethod
+    def _to_detections(r, scale: float = 1.0) -> List[dict]:
+        detections = []
+        for box in r.boxes:
+            cls_id = int(box.cls[0])
+            conf = float(box.conf[0])
+            label = YOLO_CLASSES_OF_INTEREST.get(cls_id)
+            if label is None:
+                label = r.names.get(cls_id, f"class_{cls_id}")
+            coords = box.xyxy[0].tolist()
+            detections.append({
+                "class": label,
+                "confidence": round(conf, 3),
+                "bbox": [round(c / scale, 1) for c in coords],
+            })
+        return detections
+
+class _ExportedYoloBackend(DetectorBackend):
+
+    def __init__(self, input_size: int = DETECTOR_INPUT_SIZE):
+        self.cv2 = _require_cv2()
+        self.input_size = input_size
+        self.class_ids = np.array(sorted(YOLO_CLASSES_OF_INTEREST), dtype=np.int64)
+        self.fixed_batch: Optional[int] = None
+        self.decoder = FrameDecoder(self.cv2, target_side=input_size)
+        self.buffers = BufferPool()
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def detect_batch(self, frames: Sequence[Tuple[str, bytes]]) -> List[Optional[List[dict]]]:
+        results: List[Optional[List[dict]]] = [[] for _ in frames]
+        images, scales, slots = _decode_frames(self.decoder, frames)
+        if not images:
+            return results
+
+        step = self.fixed_batch or len(images)
+        for start in range(0, len(images), step):
+            chunk = images[start:start + step]
+            blob, transforms = self._preprocess(chunk, scales[start:start + step])
+            output = self._run(blob)
+            for j, transform in enumerate(transforms):
+                i = slots[start + j]
+                results[i] = self._postprocess(output[j], transform)
+                logger.debug("%s detected %d objects from %s",
+                             self.name, len(results[i]), frames[i][0])
+        return results
+
+    def _preprocess(self, images: List[np.ndarray], scales: List[float]):
+        cv2 = self.cv2
+        s = self.input_size
+        blob = self.buffers.get("blob", (len(images), 3, s, s), np.float32)
+        canvas = self.buffers.get("canvas", (s, s, 3))
+        transforms = []
+        for i, img in enumerate(images):
+            h, w = img.shape[:2]
+            r = min(s / h, s / w)
+            nw, nh = int(round(w * r)), int(round(h * r))
+            left, top = (s - nw) // 2, (s - nh) // 2
+            canvas.fill(114)
+            resized = self.buffers.get("resized", (nh, nw, 3))
+            cv2.resize(img, (nw, nh), dst=resized, interpolation=cv2.INTER_LINEAR)
+            canvas[top:top + nh, left:left + nw] = resized
+            np.multiply(canvas[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=blob[i], casting="unsafe")
+            transforms.append((r * scales[i], left, top, w / scales[i], h / scales[i]))
+        return blob, transforms
+
+    def _postprocess(self, pred: np.ndarray, transform) -> List[dict]:
+        r, left, top, w, h = transform
+        pred = pred.T
+        scores = pred[:, 4 + self.class_ids]
+        best = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), best]
+        keep = conf >= YOLO_CONFIDENCE
+        if not keep.any():
+            return []
+
+        cx, cy, bw, bh = pred[keep, 0], pred[keep, 1], pred[keep, 2], pred[keep, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+        boxes -= np.array([left, top, left, top], dtype=np.float32)
+        boxes /= r
+        np.clip(boxes, 0, [w, h, w, h], out=boxes)
+        conf = conf[keep]
+        cls = self.class_ids[best[keep]]
+
+        detections = []
+        for k in _nms(boxes, conf, cls, DETECTOR_NMS_IOU):
+            detections.append({
+                "class": YOLO_CLASSES_OF_INTEREST[int(cls[k])],
+                "confidence": round(float(conf[k]), 3),
+                "bbox": [round(float(c), 1) for c in boxes[k]],
+            })
+        return detections
+
+class OnnxRuntimeBackend(_ExportedYoloBackend):
+    name = "onnxruntime"
+
+    def __init__(self, model_path: str = DETECTOR_ONNX_MODEL, input_size: int = DETECTOR_INPUT_SIZE):
+        import onnxruntime as ort
+        super().__init__(input_size)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = DETECTOR_THREADS
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        if isinstance(inp.shape[0], int):
+            self.fixed_batch = inp.shape[0]
+        if isinstance(inp.shape[2], int):
+            self.input_size = inp.shape[2]
+        self.description = f"ONNX Runtime ({os.path.basename(model_path)}, {self.input_size}px)"
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+class OpenCvDnnBackend(_ExportedYoloBackend):
+    name = "opencv_dnn"
+
+    def __init__(self, model_path: str = DETECTOR_ONNX_MODEL, input_size: int = DETECTOR_INPUT_SIZE):
+        super().__init__(input_size)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
+        self.cv2.setNumThreads(DETECTOR_THREADS)
+        self.net = self.cv2.dnn.readNetFromONNX(model_path)
+        self.fixed_batch = 1
+        self.description = f"OpenCV DNN ({os.path.basename(model_path)}, {self.input_size}px)"
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        self.net.setInput(blob)
+        return self.net.forward()
+
+_BACKEND_ORDER = ["onnxruntime", "opencv_dnn", "ultralytics", "contour", "threshold"]
+
+def _require_cv2():
+    if _cv2 is None:
+        raise ImportError("OpenCV is required for this detector backend")
+    return _cv2
+
+def _odd(value: float) -> int:
+    k = max(3, int(round(value)))
+    return k if k % 2 else k + 1
+
+def _decode_frames(decoder: FrameDecoder, frames: Sequence[Tuple[str, bytes]]):
+    images = []
+    scales = []
+    slots = []
+    for i, (sensor_name, frame_bytes) in enumerate(frames):
+        img, scale = decoder.decode(frame_bytes)
+        if img is None:
+            logger.warning("Failed to decode camera frame from %s", sensor_name)
+            continue
+        images.append(img)
+        scales.append(scale)
+        slots.append(i)
+    return images, scales, slots
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float) -> List[int]:
+    offset = boxes + (classes.astype(np.float32) * 4096.0)[:, None]
+    areas = (offset[:, 2] - offset[:, 0]) * (offset[:, 3] - offset[:, 1])
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        xx1 = np.maximum(offset[i, 0], offset[rest, 0])
+        yy1 = np.maximum(offset[i, 1], offset[rest, 1])
+        xx2 = np.minimum(offset[i, 2], offset[rest, 2])
+        yy2 = np.minimum(offset[i, 3], offset[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+def _create_backend(name: str) -> DetectorBackend:
+    if name == "onnxruntime":
+        return OnnxRuntimeBackend()
+    if name == "opencv_dnn":
+        return OpenCvDnnBackend()
+    if name == "ultralytics":
+        return UltralyticsBackend()
+    if name == "contour":
+        return ContourBackend(_require_cv2())
+    if name == "threshold":
+        return ThresholdBackend()
+    raise ValueError(f"Unknown detector backend '{name}'")
+
+def init_object_detector(backend: str = DETECTOR_BACKEND):
+    global _backend, _cv2
+
+    try:
+        import cv2
+        _cv2 = cv2
+    except ImportError:
+        logger.info("OpenCV not installed. Image-based detector backends unavailable.")
+
+    candidates = _BACKEND_ORDER if backend == "auto" else [backend, "contour", "threshold"]
+    for name in candidates:
+        try:
+            _backend = _create_backend(name)
+            logger.info("Object detector backend: %s", _backend.description)
+            return
+        except ImportError as exc:
+            logger.info("Detector backend '%s' unavailable (%s).", name, exc)
+        except Exception as exc:
+            logger.info("Could not load detector backend '%s' (%s).", name, exc)
+
+    _backend = ThresholdBackend()
+    logger.info("Object detection: threshold-only mode.")
+
+def active_backend() -> str:
+    return _backend.name if _backend is not None else ThresholdBackend.name
+
+def describe_backend() -> str:
+    return _backend.description if _backend is not None else ThresholdBackend.description
+
+def _detect_fallback(frame_bytes: bytes, sensor_name: str) -> List[dict]:
+    global _fallback_contour
+    if _cv2 is not None and not isinstance(_backend, ContourBackend):
+        if _fallback_contour is None:
+            _fallback_contour = ContourBackend(_cv2)
+        detections = _fallback_contour.detect(frame_bytes, sensor_name)
+        if detections is not None:
+            return detections
+    return ThresholdBackend().detect(frame_bytes, sensor_name)
+
+def detect_objects_in_frame(frame_bytes: bytes, sensor_name: str = "") -> List[dict]:
+    return detect_objects_in_batch([(sensor_name, frame_bytes)])[0]
+
+def detect_objects_in_batch(frames: Sequence[Tuple[str, bytes]]) -> List[List[dict]]:
+    if not frames:
+        return []
+
+    backend = _backend or ThresholdBackend()
+    try:
+        results = backend.detect_batch(frames)
+    except Exception as exc:
+        logger.warning("%s inference failed (%s), trying fallback.", backend.description, exc)
+        results = [None] * len(frames)
+
+    return [
+        dets if dets is not None else _detect_fallback(frame_bytes, sensor_name)
+        for dets, (sensor_name, frame_bytes) in zip(results, frames)
+    ]
@@ -0,0 +1,115 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config import FRAME_DECODE_TURBOJPEG
+
+logger = logging.getLogger("frame_decoder")
+
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_turbo = None
+_turbo_checked = False
+
+def _get_turbo():
+    global _turbo, _turbo_checked
+    if not _turbo_checked:
+        _turbo_checked = True
+        if FRAME_DECODE_TURBOJPEG:
+            try:
+                from turbojpeg import TurboJPEG
+                _turbo = TurboJPEG()
+                logger.info("libjpeg-turbo scaled decode available.")
+            except Exception as exc:
+                logger.debug("PyTurboJPEG unavailable (%s); using OpenCV decode.", exc)
+    return _turbo
+
+def jpeg_size(frame_bytes) -> Optional[Tuple[int, int]]:
+    mv = memoryview(frame_bytes)
+    n = len(mv)
+    if n < 4 or mv[0] != 0xFF or mv[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < n:
+        if mv[i] != 0xFF:
+            i += 1
+            continue
+        marker = mv[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if marker in _SOF_MARKERS:
+            h = (mv[i + 5] << 8) | mv[i + 6]
+            w = (mv[i + 7] << 8) | mv[i + 8]
+            return w, h
+        i += 2 + ((mv[i + 2] << 8) | mv[i + 3])
+    return None
+
+class FrameDecoder:
+
+    def __init__(self, cv2, target_side: Optional[int] = None, grayscale: bool = False):
+        self.cv2 = cv2
+        self.target_side = target_side
+        self.grayscale = grayscale
+        if grayscale:
+            self._flags = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                           4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+        else:
+            self._flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                           4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+    def _factor(self, size: Optional[Tuple[int, int]]) -> int:
+        if size is None or not self.target_side:
+            return 1
+        longest = max(size)
+        factor = 1
+        for f in (2, 4, 8):
+            if longest // f >= self.target_side:
+                factor = f
+        return factor
+
+    def decode(self, frame_bytes) -> Tuple[Optional[np.ndarray], float]:
+        size = jpeg_size(frame_bytes)
+        factor = self._factor(size)
+
+        img = None
+        turbo = _get_turbo() if size is not None else None
+        if turbo is not None:
+            try:
+                from turbojpeg import TJPF_BGR, TJPF_GRAY
+                img = turbo.decode(
+                    frame_bytes,
+                    pixel_format=TJPF_GRAY if self.grayscale else TJPF_BGR,
+                    scaling_factor=(1, factor),
+                )
+                if self.grayscale and img is not None and img.ndim == 3:
+                    img = img[:, :, 0]
+            except Exception as exc:
+                logger.debug("TurboJPEG decode failed (%s); using OpenCV.", exc)
+                img = None
+
+        if img is None:
+            nparr = np.frombuffer(frame_bytes, np.uint8)
+            img = self.cv2.imdecode(nparr, self._flags[factor])
+        if img is None:
+            return None, 1.0
+
+        scale = img.shape[1] / size[0] if size is not None else 1.0
+        return img, scale
+
+class BufferPool:
+
+    def __init__(self):
+        self._buffers: Dict[Tuple, np.ndarray] = {}
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        key = (name, shape, np.dtype(dtype).str)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
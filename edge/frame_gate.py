@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    FRAME_GATE_SIZE,
+    FRAME_GATE_BLOCK,
+    FRAME_GATE_THRESHOLD,
+    FRAME_GATE_MAX_AGE,
+)
+
+logger = logging.getLogger("frame_gate")
+
+try:
+    import cv2 as _cv2
+except ImportError:
+    _cv2 = None
+
+class FrameChangeGate:
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = FRAME_GATE_SIZE,
+        block: int = FRAME_GATE_BLOCK,
+        threshold: float = FRAME_GATE_THRESHOLD,
+        max_age: float = FRAME_GATE_MAX_AGE,
+    ):
+        self.width, self.height = size
+        self.block = block
+        self.threshold = threshold
+        self.max_age = max_age
+
+        self._refs: Dict[str, object] = {}
+        self._ref_times: Dict[str, float] = {}
+
+    def _signature(self, frame_bytes: bytes):
+        if not frame_bytes:
+            return None
+        if _cv2 is not None:
+            nparr = np.frombuffer(frame_bytes, np.uint8)
+            try:
+                img = _cv2.imdecode(nparr, _cv2.IMREAD_REDUCED_GRAYSCALE_8)
+            except _cv2.error as exc:
+                logger.debug("Frame gate could not decode frame: %s", exc)
+                return None
+            if img is None:
+                return None
+            small = _cv2.resize(img, (self.width, self.height), interpolation=_cv2.INTER_AREA)
+            return small.astype(np.float32)
+        return hashlib.blake2b(frame_bytes, digest_size=16).digest()
+
+    def _score(self, ref: np.ndarray, cur: np.ndarray) -> float:
+        b = self.block
+        diff = np.abs(cur - ref)
+        h = (self.height // b) * b
+        w = (self.width // b) * b
+        blocks = diff[:h, :w].reshape(h // b, b, w // b, b).mean(axis=(1, 3))
+        return float(blocks.max())
+
+    def check(self, sensor_name: str, frame_bytes: bytes, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        sig = self._signature(frame_bytes)
+        ref = self._refs.get(sensor_name)
+
+        if sig is None or ref is None or now - self._ref_times.get(sensor_name, 0.0) > self.max_age:
+            return True, sig
+        if isinstance(sig, bytes) or isinstance(ref, bytes):
+            return sig != ref, sig
+
+        score = self._score(ref, sig)
+        logger.debug("Frame change score for %s: %.2f", sensor_name, score)
+        return score > self.threshold, sig
+
+    def commit(self, sensor_name: str, signature, now: Optional[float] = None):
+        if signature is None:
+            self._refs.pop(sensor_name, None)
+            self._ref_times.pop(sensor_name, None)
+            return
+        self._refs[sensor_name] = signature
+        self._ref_times[sensor_name] = time.time() if now is None else now
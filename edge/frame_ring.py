@@ -0,0 +1,67 @@
+import logging
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+from config import FRAME_RING_SLOTS, FRAME_RING_SLOT_BYTES
+
+logger = logging.getLogger("frame_ring")
+
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+class FrameRing:
+
+    def __init__(self, slots: int = FRAME_RING_SLOTS, slot_size: int = FRAME_RING_SLOT_BYTES):
+        self.slots = max(1, slots)
+        self.slot_size = slot_size
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        self._free = deque(range(self.slots))
+        self._lock = threading.Lock()
+        self.stats = {"written": 0, "full": 0, "oversized": 0}
+        logger.info("Frame ring %s: %d slots x %d KiB",
+                    self._shm.name, self.slots, self.slot_size // 1024)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def free_slots(self) -> int:
+        with self._lock:
+            return len(self._free)
+
+    def write(self, frame_bytes: bytes) -> Optional[Tuple[int, int]]:
+        length = len(frame_bytes)
+        if length > self.slot_size:
+            self.stats["oversized"] += 1
+            return None
+        with self._lock:
+            if not self._free:
+                self.stats["full"] += 1
+                return None
+            slot = self._free.popleft()
+        offset = slot * self.slot_size
+        self._shm.buf[offset:offset + length] = frame_bytes
+        self.stats["written"] += 1
+        return slot, length
+
+    def release(self, slot: int):
+        if slot < 0:
+            return
+        with self._lock:
+            self._free.append(slot)
+
+    def close(self):
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+def read_slot(name: str, slot_size: int, slot: int, length: int) -> memoryview:
+    shm = _attached.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    offset = slot * slot_size
+    return shm.buf[offset:offset + length]
@@ -1,18 +1,29 @@
 
+import heapq
 import logging
+import threading
 import time
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from config import (
     GHOST_GRACE_PERIOD,
     GHOST_THRESHOLD,
+    GHOST_SEAT_CAPACITY,
     PRESENCE_THRESHOLD,
     MOTION_THRESHOLD,
     SEAT_TO_ZONE,
 )
-from sensor_fusion import FusedResult
+from sensor_fusion import (
+    FusedResult,
+    FUSED_DTYPE,
+    EMPTY_CODE,
+    object_type_code,
+    object_type_name,
+)
 
 logger = logging.getLogger("ghost_detector")
 
@@ -22,6 +33,19 @@ class SeatState(str, Enum):
     SUSPECTED_GHOST = "suspected_ghost"
     CONFIRMED_GHOST = "confirmed_ghost"
 
+STATES: List[SeatState] = [
+    SeatState.EMPTY,
+    SeatState.OCCUPIED,
+    SeatState.SUSPECTED_GHOST,
+    SeatState.CONFIRMED_GHOST,
+]
+_STATE_CODES: Dict[SeatState, int] = {state: i for i, state in enumerate(STATES)}
+
+_EMPTY = _STATE_CODES[SeatState.EMPTY]
+_OCCUPIED = _STATE_CODES[SeatState.OCCUPIED]
+_SUSPECTED = _STATE_CODES[SeatState.SUSPECTED_GHOST]
+_CONFIRMED = _STATE_CODES[SeatState.CONFIRMED_GHOST]
+
 @dataclass
 class SeatRecord:
     state: SeatState = SeatState.EMPTY
@@ -52,6 +76,14 @@ class GhostAlert:
             "details": self.details,
         }
 
+@dataclass
+class SeatTransition:
+    seat_id: str
+    previous_state: SeatState
+    new_state: SeatState
+    timestamp: float
+    alert: Optional[GhostAlert] = None
+
 class GhostDetector:
 
     def __init__(
@@ -60,110 +92,274 @@ class GhostDetector:
         ghost_threshold: float = GHOST_THRESHOLD,
         presence_threshold: float = PRESENCE_THRESHOLD,
         motion_threshold: float = MOTION_THRESHOLD,
+        capacity: int = GHOST_SEAT_CAPACITY,
     ):
         self.grace_period = grace_period
         self.ghost_threshold = ghost_threshold
         self.presence_threshold = presence_threshold
         self.motion_threshold = motion_threshold
 
-        self._seats: Dict[str, SeatRecord] = {}
-
-    def _get_or_create(self, seat_id: str) -> SeatRecord:
-        if seat_id not in self._seats:
-            now = time.time()
-            self._seats[seat_id] = SeatRecord(
-                state=SeatState.EMPTY,
-                last_motion_time=now,
-                state_entered_time=now,
-                last_update_time=now,
-            )
-        return self._seats[seat_id]
+        self._slots: Dict[str, int] = {}
+        self._seat_ids: List[str] = []
+        self._allocate(max(1, capacity))
+        self._counts = [0] * len(STATES)
+        self._deadlines: List[Tuple[float, int]] = []
+        self._lock = threading.RLock()
+
+    def _allocate(self, capacity: int):
+        old = getattr(self, "_state", None)
+        n = len(self._seat_ids)
+        arrays = {
+            "_state": np.full(capacity, _EMPTY, dtype=np.int8),
+            "_last_motion": np.zeros(capacity, dtype=np.float64),
+            "_state_entered": np.zeros(capacity, dtype=np.float64),
+            "_last_update": np.zeros(capacity, dtype=np.float64),
+            "_last_occupancy": np.zeros(capacity, dtype=np.float64),
+            "_last_object": np.full(capacity, EMPTY_CODE, dtype=np.int16),
+            "_armed_at": np.full(capacity, np.inf, dtype=np.float64),
+        }
+        for name, arr in arrays.items():
+            if old is not None:
+                arr[:n] = getattr(self, name)[:n]
+            setattr(self, name, arr)
+
+    def _slot(self, seat_id: str, now: Optional[float] = None) -> int:
+        slot = self._slots.get(seat_id)
+        if slot is not None:
+            return slot
+        slot = len(self._seat_ids)
+        if slot >= len(self._state):
+            self._allocate(len(self._state) * 2)
+        now = time.time() if now is None else now
+        self._slots[seat_id] = slot
+        self._seat_ids.append(seat_id)
+        self._state[slot] = _EMPTY
+        self._last_motion[slot] = now
+        self._state_entered[slot] = now
+        self._last_update[slot] = now
+        self._last_occupancy[slot] = 0.0
+        self._last_object[slot] = EMPTY_CODE
+        self._armed_at[slot] = np.inf
+        self._counts[_EMPTY] += 1
+        return slot
+
+    @property
+    def seat_count(self) -> int:
+        return len(self._seat_ids)
 
     def get_state(self, seat_id: str) -> SeatState:
-        return self._get_or_create(seat_id).state
+        with self._lock:
+            return STATES[self._state[self._slot(seat_id)]]
+
+    def get_states(self, seat_ids: Sequence[str]) -> List[SeatState]:
+        with self._lock:
+            slots = [self._slot(seat_id) for seat_id in seat_ids]
+            return [STATES[code] for code in self._state[slots].tolist()]
 
     def get_all_states(self) -> Dict[str, str]:
-        return {sid: rec.state.value for sid, rec in self._seats.items()}
+        with self._lock:
+            codes = self._state[:len(self._seat_ids)].tolist()
+            return {sid: STATES[code].value for sid, code in zip(self._seat_ids, codes)}
 
-    def get_seat_record(self, seat_id: str) -> SeatRecord:
-        return self._get_or_create(seat_id)
+    def state_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {state.value: self._counts[i] for i, state in enumerate(STATES)}
 
-    def update(self, seat_id: str, fused: FusedResult) -> Optional[GhostAlert]:
-        now = time.time()
-        rec = self._get_or_create(seat_id)
-        prev_state = rec.state
-
-        rec.last_update_time = now
-        rec.last_object_type = fused.object_type
-        rec.last_occupancy_score = fused.occupancy_score
-
-        if fused.has_motion and fused.radar_motion > self.motion_threshold:
-            rec.last_motion_time = now
-
-        if fused.radar_micro_motion:
-            rec.last_motion_time = now
-
-        time_since_motion = now - rec.last_motion_time
-        time_in_state = now - rec.state_entered_time
-
-        new_state = prev_state
-
-        if prev_state == SeatState.EMPTY:
-            if fused.is_present and fused.has_motion:
-                new_state = SeatState.OCCUPIED
-            elif fused.is_present:
-                new_state = SeatState.OCCUPIED
-
-        elif prev_state == SeatState.OCCUPIED:
-            if not fused.is_present:
-                new_state = SeatState.EMPTY
-            elif time_since_motion > self.grace_period:
-                new_state = SeatState.SUSPECTED_GHOST
-
-        elif prev_state == SeatState.SUSPECTED_GHOST:
-            if not fused.is_present:
-                new_state = SeatState.EMPTY
-            elif fused.has_motion and fused.radar_motion > self.motion_threshold:
-                new_state = SeatState.OCCUPIED
-            elif fused.radar_micro_motion:
-                new_state = SeatState.OCCUPIED
-            elif time_since_motion > self.ghost_threshold:
-                new_state = SeatState.CONFIRMED_GHOST
-
-        elif prev_state == SeatState.CONFIRMED_GHOST:
-            if not fused.is_present:
-                new_state = SeatState.EMPTY
-            elif fused.has_motion and fused.radar_motion > self.motion_threshold:
-                new_state = SeatState.OCCUPIED
-            elif fused.radar_micro_motion:
-                new_state = SeatState.OCCUPIED
-
-        if new_state != prev_state:
-            rec.state = new_state
-            rec.state_entered_time = now
-
-            alert = self._make_alert(seat_id, prev_state, new_state, now, fused)
-            if alert:
-                logger.info(
-                    "Seat %s: %s -> %s (%s)",
-                    seat_id, prev_state.value, new_state.value, alert.alert_type,
-                )
-            else:
-                logger.debug(
-                    "Seat %s: %s -> %s (no alert)",
-                    seat_id, prev_state.value, new_state.value,
-                )
-            return alert
+    def get_seat_record(self, seat_id: str) -> SeatRecord:
+        with self._lock:
+            slot = self._slot(seat_id)
+            return SeatRecord(
+                state=STATES[self._state[slot]],
+                last_motion_time=float(self._last_motion[slot]),
+                state_entered_time=float(self._state_entered[slot]),
+                last_update_time=float(self._last_update[slot]),
+                last_object_type=object_type_name(int(self._last_object[slot])),
+                last_occupancy_score=float(self._last_occupancy[slot]),
+            )
 
+    def time_to_transition(self, seat_id: str, now: Optional[float] = None) -> Optional[float]:
+        slot = self._slots.get(seat_id)
+        if slot is None:
+            return None
+        now = time.time() if now is None else now
+        state = self._state[slot]
+        if state == _OCCUPIED:
+            return self.grace_period - (now - float(self._last_motion[slot]))
+        if state == _SUSPECTED:
+            return self.ghost_threshold - (now - float(self._last_motion[slot]))
         return None
 
+    def peek_state(self, seat_id: str) -> SeatState:
+        slot = self._slots.get(seat_id)
+        return STATES[self._state[slot]] if slot is not None else SeatState.EMPTY
+
+    def update(self, seat_id: str, fused: FusedResult) -> Optional[GhostAlert]:
+        record = np.zeros(1, dtype=FUSED_DTYPE)
+        record["occupancy_score"] = fused.occupancy_score
+        record["object_code"] = object_type_code(fused.object_type)
+        record["is_present"] = fused.is_present
+        record["has_motion"] = fused.has_motion
+        record["radar_motion"] = fused.radar_motion
+        record["radar_micro_motion"] = fused.radar_micro_motion
+
+        transitions = self.update_many([seat_id], record)
+        return transitions[0].alert if transitions else None
+
+    def update_many(
+        self,
+        seat_ids: Sequence[str],
+        fused: np.ndarray,
+        now: Optional[float] = None,
+    ) -> List[SeatTransition]:
+        now = time.time() if now is None else now
+        last = {seat_id: i for i, seat_id in enumerate(seat_ids)}
+        if len(last) != len(seat_ids):
+            keep = sorted(last.values())
+            seat_ids = [seat_ids[i] for i in keep]
+            fused = fused[keep]
+        with self._lock:
+            slots = np.fromiter((self._slot(s, now) for s in seat_ids), dtype=np.intp, count=len(seat_ids))
+
+            self._last_update[slots] = now
+            self._last_object[slots] = fused["object_code"]
+            self._last_occupancy[slots] = fused["occupancy_score"]
+
+            present = fused["is_present"]
+            refreshed = (fused["has_motion"] & (fused["radar_motion"] > self.motion_threshold)) \
+                | fused["radar_micro_motion"]
+            self._last_motion[slots] = np.where(refreshed, now, self._last_motion[slots])
+            time_since_motion = now - self._last_motion[slots]
+
+            prev = self._state[slots]
+            new = prev.copy()
+
+            new[(prev == _EMPTY) & present] = _OCCUPIED
+
+            held = present & (prev != _EMPTY)
+            new[~present] = _EMPTY
+            new[held & (prev == _OCCUPIED) & (time_since_motion > self.grace_period)] = _SUSPECTED
+            returning = held & ((prev == _SUSPECTED) | (prev == _CONFIRMED))
+            new[returning & refreshed] = _OCCUPIED
+            new[returning & ~refreshed & (prev == _SUSPECTED)
+                & (time_since_motion > self.ghost_threshold)] = _CONFIRMED
+
+            changed = np.flatnonzero(new != prev)
+            if len(changed) == 0:
+                return []
+
+            changed_slots = slots[changed]
+            self._state[changed_slots] = new[changed]
+            self._state_entered[changed_slots] = now
+            for code, delta in enumerate(np.bincount(new[changed], minlength=len(STATES))
+                                         - np.bincount(prev[changed], minlength=len(STATES))):
+                self._counts[code] += int(delta)
+            self._arm(changed_slots)
+
+        return [
+            self._transition(
+                seat_ids[i], STATES[prev[i]], STATES[new[i]], now,
+                object_type_name(int(fused["object_code"][i])),
+                float(fused["occupancy_score"][i]),
+            )
+            for i in changed.tolist()
+        ]
+
+    def _deadline_for(self, slots: np.ndarray) -> np.ndarray:
+        state = self._state[slots]
+        last_motion = self._last_motion[slots]
+        return np.where(
+            state == _OCCUPIED, last_motion + self.grace_period,
+            np.where(state == _SUSPECTED, last_motion + self.ghost_threshold, np.inf),
+        )
+
+    def _arm(self, slots: np.ndarray):
+        deadlines = self._deadline_for(slots)
+        earlier = np.flatnonzero(deadlines < self._armed_at[slots])
+        for slot, deadline in zip(slots[earlier].tolist(), deadlines[earlier].tolist()):
+            self._armed_at[slot] = deadline
+            heapq.heappush(self._deadlines, (deadline, slot))
+
+    def next_deadline(self) -> Optional[float]:
+        with self._lock:
+            while self._deadlines:
+                deadline, slot = self._deadlines[0]
+                if deadline == self._armed_at[slot]:
+                    return deadline
+                heapq.heappop(self._deadlines)
+            return None
+
+    def expire(self, now: Optional[float] = None) -> List[SeatTransition]:
+        now = time.time() if now is None else now
+        fired = []
+        rearm = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, slot = heapq.heappop(self._deadlines)
+                if deadline != self._armed_at[slot]:
+                    continue
+                self._armed_at[slot] = np.inf
+
+                prev = int(self._state[slot])
+                time_since_motion = now - self._last_motion[slot]
+                if prev == _OCCUPIED and time_since_motion > self.grace_period:
+                    new = _SUSPECTED
+                elif prev == _SUSPECTED and time_since_motion > self.ghost_threshold:
+                    new = _CONFIRMED
+                else:
+                    rearm.append(slot)
+                    continue
+
+                self._state[slot] = new
+                self._state_entered[slot] = now
+                self._counts[prev] -= 1
+                self._counts[new] += 1
+                self._arm(np.array([slot]))
+                fired.append((slot, prev, new))
+
+            if rearm:
+                self._arm(np.array(rearm, dtype=np.intp))
+
+            details = [
+                (self._seat_ids[slot], prev, new,
+                 object_type_name(int(self._last_object[slot])), float(self._last_occupancy[slot]))
+                for slot, prev, new in fired
+            ]
+
+        return [
+            self._transition(seat_id, STATES[prev], STATES[new], now, object_type, occupancy)
+            for seat_id, prev, new, object_type, occupancy in details
+        ]
+
+    def _transition(
+        self,
+        seat_id: str,
+        prev_state: SeatState,
+        new_state: SeatState,
+        now: float,
+        object_type: str,
+        occupancy_score: float,
+    ) -> SeatTransition:
+        alert = self._make_alert(seat_id, prev_state, new_state, now, object_type, occupancy_score)
+        if alert:
+            logger.info(
+                "Seat %s: %s -> %s (%s)",
+                seat_id, prev_state.value, new_state.value, alert.alert_type,
+            )
+        else:
+            logger.debug(
+                "Seat %s: %s -> %s (no alert)",
+                seat_id, prev_state.value, new_state.value,
+            )
+        return SeatTransition(seat_id, prev_state, new_state, now, alert)
+
     @staticmethod
     def _make_alert(
         seat_id: str,
         prev: SeatState,
         new: SeatState,
         ts: float,
-        fused: FusedResult,
+        object_type: str,
+        occupancy_score: float,
     ) -> Optional[GhostAlert]:
         zone_id = SEAT_TO_ZONE.get(seat_id, "unknown")
 
@@ -175,8 +371,8 @@ class GhostDetector:
                 timestamp=ts,
                 previous_state=prev.value,
                 new_state=new.value,
-                details=f"Object type '{fused.object_type}' detected with no motion. "
-                         f"Occupancy score: {fused.occupancy_score:.2f}",
+                details=f"Object type '{object_type}' detected with no motion. "
+                         f"Occupancy score: {occupancy_score:.2f}",
             )
 
         if new == SeatState.CONFIRMED_GHOST:
@@ -187,7 +383,7 @@ class GhostDetector:
                 timestamp=ts,
                 previous_state=prev.value,
                 new_state=new.value,
-                details=f"Ghost confirmed. Object '{fused.object_type}' present "
+                details=f"Ghost confirmed. Object '{object_type}' present "
                          f"for extended period with no human motion.",
             )
 
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+
+from config import INFERENCE_BATCH_SIZE, INFERENCE_MAX_WAIT, INFERENCE_MAX_PENDING
+
+logger = logging.getLogger("inference_scheduler")
+
+@dataclass
+class FrameJob:
+    sensor_name: str
+    frame_bytes: Optional[bytes] = None
+    slot: int = -1
+    length: int = 0
+    submitted_at: float = 0.0
+
+class InferenceScheduler:
+
+    def __init__(
+        self,
+        infer_batch: Callable[[List[FrameJob]], Union[List[List[dict]], Future]],
+        on_result: Callable[[FrameJob, List[dict]], None],
+        on_discard: Optional[Callable[[FrameJob], None]] = None,
+        batch_size: int = INFERENCE_BATCH_SIZE,
+        max_wait: float = INFERENCE_MAX_WAIT,
+        max_pending: int = INFERENCE_MAX_PENDING,
+        max_in_flight: int = 1,
+    ):
+        self.infer_batch = infer_batch
+        self.on_result = on_result
+        self.on_discard = on_discard
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_pending = max(1, max_pending)
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        self._pending: "OrderedDict[str, FrameJob]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "batches": 0,
+            "frames": 0,
+            "superseded": 0,
+            "dropped": 0,
+            "failed": 0,
+            "in_flight": 0,
+            "last_batch_size": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Inference scheduler started (batch=%d, max_wait=%.0fms)",
+                    self.batch_size, self.max_wait * 1000)
+
+    def stop(self, timeout: float = 2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            leftover = list(self._pending.values())
+            self._pending.clear()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for job in leftover:
+            self._discard(job)
+
+    def submit(self, job: FrameJob) -> bool:
+        discarded = None
+        with self._cond:
+            if not self._running:
+                return False
+
+            prev = self._pending.get(job.sensor_name)
+            if prev is not None:
+                self.stats["superseded"] += 1
+                job.submitted_at = prev.submitted_at
+                discarded = prev
+            else:
+                job.submitted_at = time.monotonic()
+                if len(self._pending) >= self.max_pending:
+                    discarded = self._pending.popitem(last=False)[1]
+                    self.stats["dropped"] += 1
+            self._pending[job.sensor_name] = job
+            self._cond.notify()
+
+        if discarded is not None:
+            self._discard(discarded)
+        return True
+
+    def _discard(self, job: FrameJob):
+        if self.on_discard is None:
+            return
+        try:
+            self.on_discard(job)
+        except Exception as exc:
+            logger.warning("Failed to discard frame from %s: %s", job.sensor_name, exc)
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _collect(self) -> List[FrameJob]:
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._running:
+                return []
+
+            oldest = next(iter(self._pending.values()))
+            deadline = oldest.submitted_at + self.max_wait
+            while self._running and len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[1])
+            return batch
+
+    def _run(self):
+        while self._running:
+            if not self._in_flight.acquire(timeout=0.5):
+                continue
+            batch = self._collect()
+            if batch:
+                self._dispatch(batch)
+            else:
+                self._in_flight.release()
+
+    def _dispatch(self, batch: List[FrameJob]):
+        t0 = time.monotonic()
+        self.stats["in_flight"] += 1
+        try:
+            results = self.infer_batch(batch)
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+
+        if isinstance(results, Future):
+            results.add_done_callback(lambda fut: self._on_future_done(batch, t0, fut))
+        else:
+            self._complete(batch, t0, results)
+
+    def _on_future_done(self, batch: List[FrameJob], t0: float, fut: Future):
+        try:
+            results = fut.result()
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+        self._complete(batch, t0, results)
+
+    def _fail(self, batch: List[FrameJob], exc: Exception):
+        self.stats["failed"] += 1
+        self.stats["in_flight"] -= 1
+        self._in_flight.release()
+        logger.warning("Batch inference failed for %d frames: %s", len(batch), exc)
+        for job in batch:
+            self._discard(job)
+
+    def _complete(self, batch: List[FrameJob], t0: float, results: List[List[dict]]):
+        self.stats["in_flight"] -= 1
+        self._in_flight.release()
+
+        elapsed_ms = (time.monotonic() - t0) * 1000
+        self.stats["batches"] += 1
+        self.stats["frames"] += len(batch)
+        self.stats["last_batch_size"] = len(batch)
+        self.stats["last_batch_ms"] = round(elapsed_ms, 1)
+        logger.debug("Inferred batch of %d frames in %.1fms", len(batch), elapsed_ms)
+
+        for job, detections in zip(batch, results):
+            try:
+                self.on_result(job, detections)
+            except Exception as exc:
+                logger.warning("Failed to apply detections from %s: %s", job.sensor_name, exc)
@@ -0,0 +1,225 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from config import (
+    INFLUX_BATCH_SIZE,
+    INFLUX_FLUSH_INTERVAL,
+    INFLUX_QUEUE_SIZE,
+    INFLUX_OVERFLOW_POLICY,
+    INFLUX_MAX_RETRIES,
+    INFLUX_RETRY_BASE,
+    INFLUX_RETRY_MAX,
+)
+
+logger = logging.getLogger("influx_writer")
+
+OVERFLOW_POLICIES = ("drop_oldest", "block")
+REJECTED_STATUS = (400, 413, 422)
+
+FieldValue = Union[float, int, bool, str]
+
+def _escape_key(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+def _escape_measurement(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(" ", "\\ ")
+
+def _format_field(value: FieldValue) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value)
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+def is_rejected(exc: Exception) -> bool:
+    status = getattr(exc, "status", None)
+    if isinstance(status, int):
+        return status in REJECTED_STATUS
+    return isinstance(exc, (ValueError, TypeError))
+
+def line_protocol(
+    measurement: str,
+    tags: Dict[str, str],
+    fields: Dict[str, FieldValue],
+    timestamp: Optional[float] = None,
+) -> str:
+    parts = [_escape_measurement(measurement)]
+    for key in sorted(tags):
+        value = tags[key]
+        if value == "" or value is None:
+            continue
+        parts.append(f"{_escape_key(key)}={_escape_key(str(value))}")
+    head = ",".join(parts)
+    body = ",".join(
+        f"{_escape_key(k)}={_format_field(v)}" for k, v in fields.items()
+        if not (isinstance(v, float) and not math.isfinite(v))
+    )
+    if not body:
+        raise ValueError(f"No finite fields for {measurement!r}")
+    if timestamp is None:
+        return f"{head} {body}"
+    return f"{head} {body} {int(timestamp * 1e9)}"
+
+class InfluxBatchWriter:
+
+    def __init__(
+        self,
+        write_lines: Callable[[List[str]], None],
+        on_flush: Optional[Callable[[int, float], None]] = None,
+        on_failure: Optional[Callable[[List[str]], None]] = None,
+        batch_size: int = INFLUX_BATCH_SIZE,
+        flush_interval: float = INFLUX_FLUSH_INTERVAL,
+        max_queue: int = INFLUX_QUEUE_SIZE,
+        overflow_policy: str = INFLUX_OVERFLOW_POLICY,
+        max_retries: int = INFLUX_MAX_RETRIES,
+        retry_base: float = INFLUX_RETRY_BASE,
+        retry_max: float = INFLUX_RETRY_MAX,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}; expected one of {OVERFLOW_POLICIES}")
+
+        self.write_lines = write_lines
+        self.on_flush = on_flush
+        self.on_failure = on_failure
+        self.healthy = True
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max(self.batch_size, max_queue)
+        self.overflow_policy = overflow_policy
+        self.max_retries = max(0, max_retries)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "queued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "rejected": 0,
+            "retries": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="influx-writer", daemon=True)
+        self._thread.start()
+        logger.info("InfluxDB writer started (batch=%d, interval=%.1fs, queue=%d, overflow=%s)",
+                    self.batch_size, self.flush_interval, self.max_queue, self.overflow_policy)
+
+    def stop(self, timeout: float = 5.0):
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def write(self, lines: Sequence[str]) -> int:
+        accepted = 0
+        with self._cond:
+            for line in lines:
+                while len(self._queue) >= self.max_queue:
+                    if self.overflow_policy == "drop_oldest" or not self._running:
+                        self._queue.popleft()
+                        self.stats["dropped"] += 1
+                        break
+                    self._cond.wait(0.5)
+                self._queue.append(line)
+                accepted += 1
+            self.stats["queued"] += accepted
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return accepted
+
+    def _take(self) -> List[str]:
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while self._running and len(self._queue) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+            if batch:
+                self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch:
+                self._flush(batch)
+            elif not self._running:
+                break
+
+    def _flush(self, batch: List[str]):
+        for attempt in range(self.max_retries + 1):
+            t0 = time.monotonic()
+            try:
+                self.write_lines(batch)
+            except Exception as exc:
+                if is_rejected(exc):
+                    self.stats["rejected"] += len(batch)
+                    logger.error("InfluxDB rejected %d lines, dropping batch: %s", len(batch), exc)
+                    return
+                if attempt >= self.max_retries or self._stop.is_set():
+                    self.stats["failed"] += len(batch)
+                    logger.warning("InfluxDB write of %d lines failed: %s", len(batch), exc)
+                    self.healthy = False
+                    self._give_up(batch)
+                    return
+                delay = min(self.retry_max, self.retry_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                self.stats["retries"] += 1
+                logger.debug("InfluxDB write failed (%s); retry %d in %.2fs", exc, attempt + 1, delay)
+                self._stop.wait(delay)
+                continue
+
+            latency_ms = (time.monotonic() - t0) * 1000
+            self.healthy = True
+            self.stats["written"] += len(batch)
+            self.stats["flushes"] += 1
+            self.stats["last_flush_ms"] = round(latency_ms, 2)
+            logger.debug("Wrote %d lines to InfluxDB in %.1fms", len(batch), latency_ms)
+            if self.on_flush is not None:
+                self.on_flush(len(batch), latency_ms)
+            return
+
+    def _give_up(self, batch: List[str]):
+        if self.on_failure is None:
+            return
+        try:
+            self.on_failure(batch)
+        except Exception as exc:
+            logger.warning("InfluxDB failure handler raised: %s", exc)
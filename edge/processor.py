@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import base64
+import binascii
 import json
 import logging
 import signal
@@ -8,7 +9,7 @@ import sys
 import threading
 import time
 from io import BytesIO
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
@@ -17,9 +18,14 @@ from config import (
     MQTT_BROKER_PORT,
     MQTT_CLIENT_ID,
     MQTT_KEEPALIVE,
+    MQTT_USE_V5,
     MQTT_TOPIC_SENSOR,
-    MQTT_TOPIC_STATE_SEAT,
     MQTT_TOPIC_ALERTS_GHOST,
+    MQTT_TOPIC_CONTROL_CAMERA,
+    MQTT_TELEMETRY_BINARY_SUFFIX,
+    TELEMETRY_BINARY_CONTENT_TYPE,
+    MQTT_CAMERA_RAW_SUFFIX,
+    CAMERA_BINARY_CONTENT_TYPES,
     INFLUXDB_URL,
     INFLUXDB_TOKEN,
     INFLUXDB_ORG,
@@ -27,23 +33,61 @@ from config import (
     ZONE_TO_SEATS,
     SEAT_TO_ZONE,
     HTTP_FALLBACK_PORT,
-    YOLO_MODEL,
-    YOLO_CONFIDENCE,
-    YOLO_CLASSES_OF_INTEREST,
+    HTTP_MAX_BODY_BYTES,
+    CAMERA_ZONES,
+    FRAME_GATE_ENABLED,
+    TRACKER_ENABLED,
+    SAMPLING_ENABLED,
+    GHOST_TICK_INTERVAL,
+    SPOOL_ENABLED,
+    SPOOL_REPLAY_INTERVAL,
+    RECORDING_POLICY_ENABLED,
+    STATE_SNAPSHOT_INTERVAL,
     LOG_LEVEL,
     LOG_FORMAT,
     TOTAL_SEATS,
 )
-from sensor_fusion import SensorFusion, CameraResult, RadarResult, FusedResult
+from sensor_fusion import (
+    SensorFusion,
+    CameraResult,
+    FUSED_DTYPE,
+    object_type_code,
+    object_type_name,
+)
 from ghost_detector import GhostDetector, GhostAlert
+from detector import detect_objects_in_frame
+from detection_pool import DetectionPool
+from inference_scheduler import InferenceScheduler, FrameJob
+from frame_decoder import jpeg_size
+from frame_gate import FrameChangeGate
+from tracker import ObjectTracker
+from seat_map import SeatMap, best_camera_result
+from sampling import SamplingController
+from influx_writer import InfluxBatchWriter, is_rejected, line_protocol
+from spool import LineSpool
+from recording_policy import RecordingPolicy
+from state_publisher import StatePublisher
+from telemetry_codec import TelemetryBatch, TelemetryDecodeError, decode_telemetry, is_binary_telemetry
+from camera_codec import CameraDecodeError, decode_camera_frame, meta_from_user_properties
+from batch_ingest import (
+    IngestError,
+    UnsupportedEncodingError,
+    decompress_body,
+    parse_records,
+    supported_encodings,
+    telemetry_from_record,
+    telemetry_waves,
+)
 
 logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO), format=LOG_FORMAT)
 logger = logging.getLogger("processor")
 
 mqtt_client = None
+influx_client = None
 influx_write_api = None
-_yolo_model = None
-_cv2 = None
+influx_writer: Optional[InfluxBatchWriter] = None
+_influx_installed = True
+_spool: Optional[LineSpool] = None
 
 def _init_mqtt() -> bool:
     global mqtt_client
@@ -62,11 +106,12 @@ def _init_mqtt() -> bool:
             logger.warning("MQTT disconnected (rc=%s). Will retry.", reason_code)
 
         def on_message(client, userdata, msg):
-            _handle_mqtt_message(msg.topic, msg.payload)
+            _handle_mqtt_message(msg.topic, msg.payload, getattr(msg, "properties", None))
 
         client = paho_mqtt.Client(
             client_id=MQTT_CLIENT_ID,
             callback_api_version=paho_mqtt.CallbackAPIVersion.VERSION2,
+            protocol=paho_mqtt.MQTTv5 if MQTT_USE_V5 else paho_mqtt.MQTTv311,
         )
         client.on_connect = on_connect
         client.on_disconnect = on_disconnect
@@ -84,7 +129,7 @@ def _init_mqtt() -> bool:
         return False
 
 def _init_influxdb() -> bool:
-    global influx_write_api
+    global influx_client, influx_write_api, influx_writer, _influx_installed
     try:
         from influxdb_client import InfluxDBClient
         from influxdb_client.client.write_api import SYNCHRONOUS
@@ -93,263 +138,403 @@ def _init_influxdb() -> bool:
         health = client.health()
         if health.status != "pass":
             logger.warning("InfluxDB health check did not pass: %s", health.message)
+        influx_client = client
         influx_write_api = client.write_api(write_options=SYNCHRONOUS)
+        influx_writer = InfluxBatchWriter(
+            lambda lines: influx_write_api.write(bucket=INFLUXDB_BUCKET, record=lines),
+            on_flush=_on_influx_flush,
+            on_failure=_spool_lines,
+        )
+        influx_writer.start()
         logger.info("InfluxDB connected at %s (org=%s, bucket=%s)",
                      INFLUXDB_URL, INFLUXDB_ORG, INFLUXDB_BUCKET)
         return True
     except ImportError:
+        _influx_installed = False
         logger.warning("influxdb-client not installed. InfluxDB writes disabled.")
         return False
     except Exception as exc:
-        logger.warning("Cannot connect to InfluxDB at %s (%s). Writes disabled.",
-                        INFLUXDB_URL, exc)
+        logger.warning("Cannot connect to InfluxDB at %s (%s). %s",
+                        INFLUXDB_URL, exc,
+                        "Spooling writes to disk." if _spool is not None else "Writes disabled.")
         return False
 
-def _init_object_detector():
-    global _yolo_model, _cv2
-
+def _influx_ping() -> bool:
     try:
-        from ultralytics import YOLO
-        _yolo_model = YOLO(YOLO_MODEL)
-        logger.info("YOLOv8 model loaded: %s", YOLO_MODEL)
-        return
-    except ImportError:
-        logger.info("ultralytics not installed. Falling back to OpenCV detection.")
+        return influx_client is not None and bool(influx_client.ping())
     except Exception as exc:
-        logger.info("Could not load YOLOv8 model (%s). Falling back to OpenCV.", exc)
+        logger.debug("InfluxDB ping failed: %s", exc)
+        return False
 
+def _init_spool() -> bool:
+    global _spool
+    if not SPOOL_ENABLED:
+        return False
     try:
-        import cv2
-        _cv2 = cv2
-        logger.info("OpenCV %s loaded for fallback detection.", cv2.__version__)
-        return
-    except ImportError:
-        logger.info("OpenCV not installed. Using threshold-only fallback detector.")
-
-    logger.info("Object detection: threshold-only mode (no YOLO, no OpenCV).")
+        _spool = LineSpool()
+        return True
+    except OSError as exc:
+        logger.warning("Cannot open spool directory (%s). Failed writes will be lost.", exc)
+        return False
 
 fusion = SensorFusion()
 ghost_detector = GhostDetector()
 
 _camera_detections: Dict[str, List[CameraResult]] = {}
+_seat_camera: Dict[str, CameraResult] = {}
+_sensor_frame_size: Dict[str, Tuple[int, int]] = {}
+_seat_map = SeatMap()
+_camera_lock = threading.Lock()
+_sensor_detections: Dict[str, List[dict]] = {}
+_frame_gate = FrameChangeGate() if FRAME_GATE_ENABLED else None
+_trackers: Dict[str, ObjectTracker] = {}
+_sampling = SamplingController(ghost_detector) if SAMPLING_ENABLED else None
+_camera_sensors: Dict[str, List[str]] = {}
+_last_updates: Dict[str, dict] = {}
+_recording_policy = RecordingPolicy() if RECORDING_POLICY_ENABLED else None
+_state_publisher = StatePublisher()
+
+def _tracker_for(sensor_name: str) -> Optional[ObjectTracker]:
+    if not TRACKER_ENABLED:
+        return None
+    tracker = _trackers.get(sensor_name)
+    if tracker is None:
+        tracker = _trackers.setdefault(sensor_name, ObjectTracker())
+    return tracker
 
 _stats = {
     "telemetry_count": 0,
     "camera_count": 0,
+    "camera_rejected": 0,
     "ghost_alerts": 0,
     "mqtt_publishes": 0,
     "influx_writes": 0,
+    "frame_gate_hits": 0,
+    "frame_gate_misses": 0,
+    "tracker_propagated": 0,
+    "frames_sampled_out": 0,
+    "influx_queue_depth": 0,
+    "influx_flush_ms": 0.0,
+    "influx_dropped": 0,
+    "spool_bytes": 0,
 }
 
-def detect_objects_in_frame(frame_bytes: bytes, sensor_name: str = "") -> List[dict]:
-    detections = []
-
-    if _yolo_model is not None:
-        try:
-            nparr = np.frombuffer(frame_bytes, np.uint8)
-            import cv2 as _cv
-            img = _cv.imdecode(nparr, _cv.IMREAD_COLOR)
-            if img is None:
-                logger.warning("Failed to decode camera frame from %s", sensor_name)
-                return detections
-
-            results = _yolo_model(img, conf=YOLO_CONFIDENCE, verbose=False)
-            for r in results:
-                for box in r.boxes:
-                    cls_id = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    label = YOLO_CLASSES_OF_INTEREST.get(cls_id)
-                    if label is None:
-                        label = r.names.get(cls_id, f"class_{cls_id}")
-                    coords = box.xyxy[0].tolist()
-                    detections.append({
-                        "class": label,
-                        "confidence": round(conf, 3),
-                        "bbox": [round(c, 1) for c in coords],
-                    })
-            logger.debug("YOLO detected %d objects from %s", len(detections), sensor_name)
-            return detections
-        except Exception as exc:
-            logger.warning("YOLO inference failed (%s), trying fallback.", exc)
-
-    if _cv2 is not None:
-        try:
-            nparr = np.frombuffer(frame_bytes, np.uint8)
-            img = _cv2.imdecode(nparr, _cv2.IMREAD_COLOR)
-            if img is None:
-                return detections
-            gray = _cv2.cvtColor(img, _cv2.COLOR_BGR2GRAY)
-            blurred = _cv2.GaussianBlur(gray, (11, 11), 0)
-            thresh = _cv2.adaptiveThreshold(
-                blurred, 255, _cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                _cv2.THRESH_BINARY_INV, 25, 8,
-            )
-            contours, _ = _cv2.findContours(thresh, _cv2.RETR_EXTERNAL, _cv2.CHAIN_APPROX_SIMPLE)
-            h, w = img.shape[:2]
-            min_area = (h * w) * 0.01
-
-            for cnt in contours:
-                area = _cv2.contourArea(cnt)
-                if area < min_area:
-                    continue
-                x, y, bw, bh = _cv2.boundingRect(cnt)
-                aspect = bh / max(bw, 1)
-                fill_ratio = area / max(bw * bh, 1)
-                conf = min(1.0, (area / (h * w)) * 3)
-                if aspect > 1.5 and fill_ratio > 0.3:
-                    label = "person"
-                    conf = min(1.0, conf * 1.2)
-                elif area > min_area * 2:
-                    label = "object"
-                else:
-                    label = "unknown"
-
-                detections.append({
-                    "class": label,
-                    "confidence": round(conf, 3),
-                    "bbox": [x, y, x + bw, y + bh],
-                })
-
-            logger.debug("OpenCV detected %d contours from %s", len(detections), sensor_name)
-            return detections
-        except Exception as exc:
-            logger.warning("OpenCV detection failed (%s).", exc)
+def _zones_for_sensor(sensor_name: str) -> List[str]:
+    is_back = "Back" in sensor_name or "back" in sensor_name
+    return CAMERA_ZONES["back"] if is_back else CAMERA_ZONES["front"]
 
-    try:
-        nparr = np.frombuffer(frame_bytes, np.uint8)
-        mean_val = float(np.mean(nparr))
-        if mean_val > 60:
-            detections.append({
-                "class": "object",
-                "confidence": round(min(1.0, mean_val / 180), 3),
-                "bbox": [0, 0, 0, 0],
-            })
-        logger.debug("Threshold fallback: mean=%.1f, detections=%d", mean_val, len(detections))
-    except Exception as exc:
-        logger.warning("Threshold detection failed: %s", exc)
+def _zone_from_sensor_name(sensor_name: str, detections: List[dict]) -> Dict[str, CameraResult]:
+    best = best_camera_result(detections)
+    return {z: best for z in _zones_for_sensor(sensor_name)}
+
+def _seats_for_sensor(sensor_name: str) -> List[str]:
+    seat_ids = _camera_sensors.get(sensor_name)
+    if seat_ids is None:
+        seat_ids = [s for z in _zones_for_sensor(sensor_name) for s in ZONE_TO_SEATS.get(z, [])]
+        with _camera_lock:
+            seat_ids = _camera_sensors.setdefault(sensor_name, seat_ids)
+    return seat_ids
+
+def _seats_from_sensor_name(sensor_name: str, detections: List[dict]) -> Dict[str, CameraResult]:
+    index = _seat_map.index_for(sensor_name)
+    if index is None:
+        return {}
+    return index.assign(detections, _sensor_frame_size.get(sensor_name))
 
-    return detections
+def process_telemetry(data: dict):
+    _process_telemetry_batch(TelemetryBatch.from_json(data))
 
-def _zone_from_sensor_name(sensor_name: str, detections: List[dict]) -> Dict[str, CameraResult]:
-    results: Dict[str, CameraResult] = {}
-    is_back = "Back" in sensor_name or "back" in sensor_name
+def process_telemetry_binary(payload: bytes):
+    _process_telemetry_batch(decode_telemetry(payload))
 
-    zones = ["Z1", "Z2", "Z3", "Z4"] if is_back else ["Z5", "Z6", "Z7"]
+def _process_telemetry_batch(batch: TelemetryBatch):
+    _process_telemetry_wave([batch])
 
-    best_person = CameraResult("empty", 0.0)
-    best_object = CameraResult("empty", 0.0)
+def _process_telemetry_wave(batches: List[TelemetryBatch]):
+    _stats["telemetry_count"] += len(batches)
+    if len(batches) == 1:
+        logger.info(
+            "Telemetry #%d from %s zone %s (%d seats)",
+            _stats["telemetry_count"], batches[0].sensor, batches[0].zone_id, len(batches[0]),
+        )
+    else:
+        logger.info(
+            "Telemetry batch of %d messages (%d seats), total #%d",
+            len(batches), sum(len(b) for b in batches), _stats["telemetry_count"],
+        )
 
-    for det in detections:
-        cls = det["class"]
-        conf = det["confidence"]
-        if cls == "person" and conf > best_person.confidence:
-            best_person = CameraResult("person", conf)
-        elif cls != "person" and cls != "empty" and conf > best_object.confidence:
-            best_object = CameraResult(cls, conf)
+    state_updates: Dict[str, dict] = {}
 
-    best = best_person if best_person.confidence > best_object.confidence else best_object
-    if best.confidence == 0.0:
-        best = CameraResult("empty", 0.0)
+    seat_ids = [seat_id for b in batches for seat_id in b.seat_ids]
+    seat_zones = [b.zone_id for b in batches for _ in b.seat_ids]
+    seat_times = [b.timestamp for b in batches for _ in b.seat_ids]
+    cam_conf = np.concatenate([b.confidence for b in batches])
+    cam_type = np.concatenate([b.object_code for b in batches])
+
+    with _camera_lock:
+        seat_cams = [_seat_camera.get(seat_id) for seat_id in seat_ids]
+        zone_cams = {b.zone_id: _camera_detections.get(b.zone_id) for b in batches}
+
+    for i, cam in enumerate(seat_cams):
+        if cam is None and zone_cams[seat_zones[i]]:
+            cam = zone_cams[seat_zones[i]][0]
+        if cam is not None:
+            cam_conf[i] = cam.confidence
+            cam_type[i] = object_type_code(cam.object_type)
+
+    fused_batch = fusion.fuse_batch(
+        cam_conf,
+        cam_type,
+        np.concatenate([b.presence for b in batches]),
+        np.concatenate([b.motion for b in batches]),
+        np.concatenate([b.micro_motion for b in batches]),
+    )
 
-    for z in zones:
-        results[z] = best
+    transitions = ghost_detector.update_many(seat_ids, fused_batch)
+    alerts = [t.alert for t in transitions if t.alert is not None]
+    seat_states = ghost_detector.get_states(seat_ids)
 
-    return results
+    columns = {name: fused_batch[name].tolist() for name in FUSED_DTYPE.names}
+    for i, seat_id in enumerate(seat_ids):
+        state_updates[seat_id] = {
+            "seat_id": seat_id,
+            "zone_id": SEAT_TO_ZONE.get(seat_id, seat_zones[i]),
+            "state": seat_states[i].value,
+            "occupancy_score": columns["occupancy_score"][i],
+            "object_type": object_type_name(columns["object_code"][i]),
+            "confidence": columns["confidence"][i],
+            "is_present": columns["is_present"][i],
+            "has_motion": columns["has_motion"][i],
+            "radar_presence": columns["radar_presence"][i],
+            "radar_motion": columns["radar_motion"][i],
+            "radar_micro_motion": columns["radar_micro_motion"][i],
+            "timestamp": seat_times[i],
+        }
 
-def process_telemetry(data: dict):
-    _stats["telemetry_count"] += 1
-    zone_id = data.get("zone_id", "")
-    sensor_name = data.get("sensor", "unknown")
-    seats_data = data.get("seats", {})
-    ts_epoch = data.get("timestamp", time.time())
+    _last_updates.update(state_updates)
+    _publish_state_updates(state_updates)
+    for alert in alerts:
+        _publish_ghost_alert(alert)
 
-    logger.info(
-        "Telemetry #%d from %s zone %s (%d seats)",
-        _stats["telemetry_count"], sensor_name, zone_id, len(seats_data),
-    )
+    _write_to_influxdb(state_updates, alerts)
+    _request_camera_rates()
 
-    alerts: List[GhostAlert] = []
-    state_updates: Dict[str, dict] = {}
+def process_ingest_batch(records: List[dict]) -> List[dict]:
+    results: List[dict] = [{"index": i, "status": "ok"} for i in range(len(records))]
+    telemetry: List[TelemetryBatch] = []
+    telemetry_index: List[int] = []
 
-    for seat_id, info in seats_data.items():
-        radar = RadarResult(
-            presence=float(info.get("presence", 0)),
-            motion=float(info.get("motion", 0)),
-            micro_motion=bool(info.get("micro_motion", False)),
-        )
+    for i, record in enumerate(records):
+        kind = record.get("type") if isinstance(record, dict) else None
+        try:
+            if kind == "telemetry":
+                telemetry.append(telemetry_from_record(record))
+                telemetry_index.append(i)
+            elif kind == "camera":
+                if record.get("format") == "binary":
+                    meta, frame_bytes = decode_camera_frame(base64.b64decode(record.get("data", "")))
+                    sensor_name = meta.get("sensor") or record.get("sensor", "unknown")
+                    admitted = process_camera_bytes(sensor_name, frame_bytes)
+                else:
+                    admitted = process_camera_frame(record)
+                if not admitted:
+                    results[i] = {"index": i, "status": "ok", "sampled_out": True}
+            else:
+                results[i] = {"index": i, "status": "error", "error": f"unknown record type {kind!r}"}
+        except Exception as exc:
+            results[i] = {"index": i, "status": "error", "error": str(exc)}
 
-        cam = None
-        if zone_id in _camera_detections:
-            zone_cams = _camera_detections[zone_id]
-            if zone_cams:
-                cam = zone_cams[0]
-        if cam is None:
-            obj_type = info.get("object_type", "empty")
-            conf = float(info.get("confidence", 0))
-            cam = CameraResult(object_type=obj_type, confidence=conf)
+    position = 0
+    for wave in telemetry_waves(telemetry):
+        indexes = telemetry_index[position:position + len(wave)]
+        position += len(wave)
+        try:
+            _process_telemetry_wave(wave)
+        except Exception as exc:
+            logger.error("Error processing telemetry batch: %s", exc, exc_info=True)
+            for i in indexes:
+                results[i] = {"index": i, "status": "error", "error": str(exc)}
 
-        fused = fusion.fuse(camera_result=cam, radar_result=radar)
+    return results
 
-        alert = ghost_detector.update(seat_id, fused)
-        if alert is not None:
-            alerts.append(alert)
+def _fire_ghost_deadlines(now: Optional[float] = None):
+    transitions = ghost_detector.expire(now)
+    if not transitions:
+        return
 
-        seat_state = ghost_detector.get_state(seat_id).value
-        state_updates[seat_id] = {
-            "seat_id": seat_id,
-            "zone_id": SEAT_TO_ZONE.get(seat_id, zone_id),
-            "state": seat_state,
-            "occupancy_score": fused.occupancy_score,
-            "object_type": fused.object_type,
-            "confidence": fused.confidence,
-            "is_present": fused.is_present,
-            "has_motion": fused.has_motion,
-            "radar_presence": fused.radar_presence,
-            "radar_motion": fused.radar_motion,
-            "radar_micro_motion": fused.radar_micro_motion,
-            "timestamp": ts_epoch,
-        }
+    state_updates: Dict[str, dict] = {}
+    alerts: List[GhostAlert] = []
+    for t in transitions:
+        update = dict(_last_updates.get(t.seat_id) or {
+            "seat_id": t.seat_id,
+            "zone_id": SEAT_TO_ZONE.get(t.seat_id, ""),
+        })
+        update["state"] = t.new_state.value
+        update["timestamp"] = t.timestamp
+        state_updates[t.seat_id] = update
+        if t.alert is not None:
+            alerts.append(t.alert)
 
+    _last_updates.update(state_updates)
     _publish_state_updates(state_updates)
     for alert in alerts:
         _publish_ghost_alert(alert)
 
     _write_to_influxdb(state_updates, alerts)
+    _request_camera_rates()
+
+def _ghost_timer_loop(interval: float = GHOST_TICK_INTERVAL):
+    while True:
+        deadline = ghost_detector.next_deadline()
+        delay = interval if deadline is None else min(interval, deadline - time.time())
+        time.sleep(max(0.01, delay))
+        try:
+            _fire_ghost_deadlines()
+        except Exception as exc:
+            logger.error("Ghost deadline tick failed: %s", exc)
 
-def process_camera_frame(data: dict):
+def _sampling_admits(sensor_name: str) -> bool:
+    seat_ids = _seats_for_sensor(sensor_name)
+    if _sampling is not None and not _sampling.should_infer(sensor_name, seat_ids):
+        _stats["frames_sampled_out"] += 1
+        logger.debug("Camera frame from %s skipped by sampling controller", sensor_name)
+        return False
+    return True
+
+def process_camera_frame(data: dict) -> bool:
     _stats["camera_count"] += 1
     sensor_name = data.get("sensor", "unknown")
     frame_b64 = data.get("frame", "")
 
     if not frame_b64:
-        logger.warning("Empty camera frame from %s", sensor_name)
-        return
+        _stats["camera_rejected"] += 1
+        raise CameraDecodeError(f"Empty camera frame from {sensor_name}")
+
+    if not _sampling_admits(sensor_name):
+        return False
 
     try:
         frame_bytes = base64.b64decode(frame_b64)
-    except Exception as exc:
-        logger.warning("Failed to decode base64 frame from %s: %s", sensor_name, exc)
-        return
+    except (binascii.Error, TypeError, ValueError) as exc:
+        _stats["camera_rejected"] += 1
+        raise CameraDecodeError(f"Failed to decode base64 frame from {sensor_name}: {exc}") from exc
+    if not frame_bytes:
+        _stats["camera_rejected"] += 1
+        raise CameraDecodeError(f"Camera frame from {sensor_name} decoded to zero bytes")
+
+    _process_frame_bytes(sensor_name, frame_bytes)
+    return True
+
+def process_camera_bytes(sensor_name: str, frame_bytes: bytes) -> bool:
+    _stats["camera_count"] += 1
+    if not frame_bytes:
+        _stats["camera_rejected"] += 1
+        raise CameraDecodeError(f"Empty camera frame from {sensor_name}")
+
+    if not _sampling_admits(sensor_name):
+        return False
+
+    _process_frame_bytes(sensor_name, bytes(frame_bytes))
+    return True
 
+def _process_frame_bytes(sensor_name: str, frame_bytes: bytes):
     logger.info(
         "Camera frame #%d from %s (%d bytes)",
         _stats["camera_count"], sensor_name, len(frame_bytes),
     )
 
-    detections = detect_objects_in_frame(frame_bytes, sensor_name)
+    size = jpeg_size(frame_bytes)
+    if size is not None:
+        _sensor_frame_size[sensor_name] = size
+
+    if _frame_gate is not None:
+        changed, signature = _frame_gate.check(sensor_name, frame_bytes)
+        cached = _sensor_detections.get(sensor_name)
+        if not changed and cached is not None:
+            _stats["frame_gate_hits"] += 1
+            _update_camera_detections(sensor_name, cached)
+            logger.debug("Frame from %s unchanged; reusing %d cached detections",
+                         sensor_name, len(cached))
+            return
+        _stats["frame_gate_misses"] += 1
+        _frame_gate.commit(sensor_name, signature)
+
+    tracker = _tracker_for(sensor_name)
+    if tracker is not None and not tracker.needs_detection():
+        _stats["tracker_propagated"] += 1
+        detections = tracker.predict()
+        _sensor_detections[sensor_name] = detections
+        _update_camera_detections(sensor_name, detections)
+        return
+
+    job = _detection_pool.stage(sensor_name, frame_bytes)
+    if not _inference_scheduler.submit(job):
+        _detection_pool.release(job)
+        job = FrameJob(sensor_name, frame_bytes=frame_bytes, length=len(frame_bytes))
+        _apply_detections(job, detect_objects_in_frame(frame_bytes, sensor_name))
+
+def _infer_frame_batch(jobs: List[FrameJob]):
+    return _detection_pool.submit(jobs)
 
+def _update_camera_detections(sensor_name: str, detections: List[dict]):
     zone_results = _zone_from_sensor_name(sensor_name, detections)
-    for zone_id, cam_result in zone_results.items():
-        _camera_detections[zone_id] = [cam_result]
+    seat_results = _seats_from_sensor_name(sensor_name, detections)
+    index = _seat_map.index_for(sensor_name)
+    with _camera_lock:
+        for zone_id, cam_result in zone_results.items():
+            _camera_detections[zone_id] = [cam_result]
+        for seat_id in index.seat_ids if index is not None else ():
+            _seat_camera[seat_id] = seat_results.get(seat_id, CameraResult("empty", 0.0))
+
+def _apply_detections(job: FrameJob, detections: List[dict]):
+    _detection_pool.release(job)
+    tracker = _tracker_for(job.sensor_name)
+    if tracker is not None:
+        detections = tracker.update(detections)
+    _sensor_detections[job.sensor_name] = detections
+    _update_camera_detections(job.sensor_name, detections)
 
     if detections:
         logger.info(
             "Detected %d objects from %s: %s",
-            len(detections), sensor_name,
+            len(detections), job.sensor_name,
             ", ".join(f"{d['class']}({d['confidence']:.0%})" for d in detections[:5]),
         )
 
-def _handle_mqtt_message(topic: str, payload: bytes):
+_detection_pool = DetectionPool()
+
+_inference_scheduler = InferenceScheduler(
+    infer_batch=_infer_frame_batch,
+    on_result=_apply_detections,
+    on_discard=_detection_pool.release,
+    max_in_flight=max(1, _detection_pool.workers),
+)
+
+def _sensor_from_topic(topic: str) -> str:
+    parts = topic.split("/")
+    return parts[2] if len(parts) >= 4 else "unknown"
+
+def _handle_mqtt_message(topic: str, payload: bytes, properties=None):
+    if topic.endswith(MQTT_CAMERA_RAW_SUFFIX):
+        try:
+            meta, frame_bytes = decode_camera_frame(payload)
+        except CameraDecodeError as exc:
+            logger.warning("Invalid raw camera frame on %s: %s", topic, exc)
+            return
+        meta.update(meta_from_user_properties(properties))
+        try:
+            process_camera_bytes(meta.get("sensor") or _sensor_from_topic(topic), frame_bytes)
+        except CameraDecodeError as exc:
+            logger.warning("Rejected raw camera frame on %s: %s", topic, exc)
+        return
+
+    if topic.endswith(MQTT_TELEMETRY_BINARY_SUFFIX) or is_binary_telemetry(payload):
+        try:
+            process_telemetry_binary(payload)
+        except TelemetryDecodeError as exc:
+            logger.warning("Invalid binary telemetry on %s: %s", topic, exc)
+        return
+
     try:
         data = json.loads(payload.decode("utf-8"))
     except (json.JSONDecodeError, UnicodeDecodeError) as exc:
@@ -359,23 +544,44 @@ def _handle_mqtt_message(topic: str, payload: bytes):
     if topic.endswith("/telemetry"):
         process_telemetry(data)
     elif topic.endswith("/camera"):
-        process_camera_frame(data)
+        try:
+            process_camera_frame(data)
+        except CameraDecodeError as exc:
+            logger.warning("Rejected camera frame on %s: %s", topic, exc)
     else:
         logger.debug("Unhandled MQTT topic: %s", topic)
 
 def _publish_state_updates(updates: Dict[str, dict]):
-    for seat_id, state_data in updates.items():
-        topic = MQTT_TOPIC_STATE_SEAT.replace("{seat_id}", seat_id)
-        payload = json.dumps(state_data)
+    _stats["mqtt_publishes"] += _state_publisher.publish(mqtt_client, updates)
 
-        if mqtt_client is not None and mqtt_client.is_connected():
-            try:
-                mqtt_client.publish(topic, payload, qos=1)
+def _publish_snapshots_periodically(interval: float = STATE_SNAPSHOT_INTERVAL):
+    while True:
+        time.sleep(interval)
+        try:
+            if _state_publisher.publish_snapshot(mqtt_client):
                 _stats["mqtt_publishes"] += 1
-            except Exception as exc:
-                logger.warning("MQTT publish failed for %s: %s", topic, exc)
-        else:
-            logger.debug("MQTT unavailable. State for %s: %s", seat_id, state_data["state"])
+        except Exception as exc:
+            logger.error("State snapshot failed: %s", exc)
+
+def _request_camera_rates():
+    if _sampling is None or mqtt_client is None or not mqtt_client.is_connected():
+        return
+
+    with _camera_lock:
+        sensors = dict(_camera_sensors)
+    for sensor_name, interval in _sampling.pending_rate_requests(sensors).items():
+        topic = MQTT_TOPIC_CONTROL_CAMERA.replace("{rail}", sensor_name)
+        payload = json.dumps({
+            "sensor": sensor_name,
+            "interval": interval,
+            "fps": round(1.0 / interval, 3) if interval > 0 else 0,
+        })
+        try:
+            mqtt_client.publish(topic, payload, qos=1, retain=True)
+            _stats["mqtt_publishes"] += 1
+            _sampling.mark_requested(sensor_name, interval)
+        except Exception as exc:
+            logger.warning("MQTT publish failed for %s: %s", topic, exc)
 
 def _publish_ghost_alert(alert: GhostAlert):
     _stats["ghost_alerts"] += 1
@@ -393,50 +599,90 @@ def _publish_ghost_alert(alert: GhostAlert):
         except Exception as exc:
             logger.warning("MQTT publish failed for ghost alert: %s", exc)
 
+def _on_influx_flush(count: int, latency_ms: float):
+    _stats["influx_writes"] += count
+    _stats["influx_flush_ms"] = round(latency_ms, 2)
+    _stats["influx_queue_depth"] = influx_writer.depth if influx_writer is not None else 0
+
+def _spool_lines(lines: List[str]):
+    if _spool is None:
+        logger.warning("Dropping %d InfluxDB line(s); spool disabled", len(lines))
+        return
+    try:
+        _spool.append(lines)
+        _stats["spool_bytes"] = _spool.pending_bytes
+    except OSError as exc:
+        logger.warning("Spool write failed, %d line(s) lost: %s", len(lines), exc)
+
 def _write_to_influxdb(updates: Dict[str, dict], alerts: List[GhostAlert]):
-    if influx_write_api is None:
+    if influx_writer is None and (_spool is None or not _influx_installed):
         return
 
-    try:
-        from influxdb_client import Point
-
-        points = []
-
-        for seat_id, state_data in updates.items():
-            p = (
-                Point("seat_state")
-                .tag("seat_id", seat_id)
-                .tag("zone_id", state_data.get("zone_id", ""))
-                .tag("state", state_data.get("state", ""))
-                .field("occupancy_score", float(state_data.get("occupancy_score", 0)))
-                .field("confidence", float(state_data.get("confidence", 0)))
-                .field("is_present", bool(state_data.get("is_present", False)))
-                .field("has_motion", bool(state_data.get("has_motion", False)))
-                .field("radar_presence", float(state_data.get("radar_presence", 0)))
-                .field("radar_motion", float(state_data.get("radar_motion", 0)))
-                .field("object_type", str(state_data.get("object_type", "empty")))
-            )
-            points.append(p)
-
-        for alert in alerts:
-            p = (
-                Point("ghost_alert")
-                .tag("seat_id", alert.seat_id)
-                .tag("zone_id", alert.zone_id)
-                .tag("alert_type", alert.alert_type)
-                .field("details", alert.details)
-                .field("previous_state", alert.previous_state)
-                .field("new_state", alert.new_state)
-            )
-            points.append(p)
-
-        if points:
-            influx_write_api.write(bucket=INFLUXDB_BUCKET, record=points)
-            _stats["influx_writes"] += len(points)
-            logger.debug("Wrote %d points to InfluxDB", len(points))
+    if _recording_policy is not None:
+        updates = _recording_policy.filter(updates)
 
-    except Exception as exc:
-        logger.warning("InfluxDB write failed: %s", exc)
+    lines = []
+    for seat_id, state_data in updates.items():
+        lines.append(line_protocol(
+            "seat_state",
+            {
+                "seat_id": seat_id,
+                "zone_id": state_data.get("zone_id", ""),
+            },
+            {
+                "state": str(state_data.get("state", "")),
+                "occupancy_score": float(state_data.get("occupancy_score", 0)),
+                "confidence": float(state_data.get("confidence", 0)),
+                "is_present": bool(state_data.get("is_present", False)),
+                "has_motion": bool(state_data.get("has_motion", False)),
+                "radar_presence": float(state_data.get("radar_presence", 0)),
+                "radar_motion": float(state_data.get("radar_motion", 0)),
+                "object_type": str(state_data.get("object_type", "empty")),
+            },
+            state_data.get("timestamp"),
+        ))
+
+    for alert in alerts:
+        lines.append(line_protocol(
+            "ghost_alert",
+            {
+                "seat_id": alert.seat_id,
+                "zone_id": alert.zone_id,
+                "alert_type": alert.alert_type,
+            },
+            {
+                "details": alert.details,
+                "previous_state": alert.previous_state,
+                "new_state": alert.new_state,
+            },
+            alert.timestamp,
+        ))
+
+    if not lines:
+        return
+    if influx_writer is not None and influx_writer.healthy:
+        influx_writer.write(lines)
+        _stats["influx_queue_depth"] = influx_writer.depth
+        _stats["influx_dropped"] = influx_writer.stats["dropped"]
+    else:
+        _spool_lines(lines)
+
+def _replay_spool_periodically(interval: float = SPOOL_REPLAY_INTERVAL):
+    while True:
+        time.sleep(interval)
+        if _spool is None or not _influx_installed:
+            continue
+        if _spool.pending_bytes == 0 and (influx_writer is None or influx_writer.healthy):
+            continue
+        if influx_writer is None and not _init_influxdb():
+            continue
+        try:
+            replayed = _spool.replay(influx_writer.write_lines, is_rejected=is_rejected)
+            influx_writer.healthy = replayed > 0 or _influx_ping()
+        except Exception as exc:
+            influx_writer.healthy = False
+            logger.debug("Spool replay deferred, InfluxDB still unavailable: %s", exc)
+        _stats["spool_bytes"] = _spool.pending_bytes
 
 def _run_http_server():
     try:
@@ -446,10 +692,22 @@ def _run_http_server():
         return
 
     app = Flask("liberty_twin_edge")
+    app.config["MAX_CONTENT_LENGTH"] = HTTP_MAX_BODY_BYTES
     app.logger.setLevel(logging.WARNING)
 
     @app.route("/api/telemetry", methods=["POST"])
     def api_telemetry():
+        body = request.get_data()
+        if request.mimetype == TELEMETRY_BINARY_CONTENT_TYPE or is_binary_telemetry(body):
+            try:
+                process_telemetry_binary(body)
+            except TelemetryDecodeError as exc:
+                return jsonify({"error": str(exc)}), 400
+            except Exception as exc:
+                logger.error("Error processing telemetry: %s", exc, exc_info=True)
+                return jsonify({"error": str(exc)}), 500
+            return jsonify({"ok": True})
+
         data = request.get_json(silent=True)
         if not data:
             return jsonify({"error": "no JSON body"}), 400
@@ -460,13 +718,62 @@ def _run_http_server():
             return jsonify({"error": str(exc)}), 500
         return jsonify({"ok": True})
 
+    @app.route("/api/ingest/batch", methods=["POST"])
+    def api_ingest_batch():
+        try:
+            body = decompress_body(request.get_data(), request.headers.get("Content-Encoding", ""))
+            records = parse_records(body)
+        except UnsupportedEncodingError as exc:
+            return jsonify({"error": str(exc), "supported": supported_encodings()}), 415
+        except IngestError as exc:
+            return jsonify({"error": str(exc)}), 400
+        results = process_ingest_batch(records)
+        failed = sum(1 for r in results if r["status"] != "ok")
+        return jsonify({
+            "ok": failed == 0,
+            "accepted": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        })
+
     @app.route("/api/camera", methods=["POST"])
     def api_camera():
+        if request.mimetype in CAMERA_BINARY_CONTENT_TYPES:
+            try:
+                meta, frame_bytes = decode_camera_frame(request.get_data())
+            except CameraDecodeError as exc:
+                return jsonify({"error": str(exc)}), 400
+            sensor_name = meta.get("sensor") or request.args.get("sensor") \
+                or request.headers.get("X-Sensor", "unknown")
+            try:
+                process_camera_bytes(sensor_name, frame_bytes)
+            except CameraDecodeError as exc:
+                return jsonify({"error": str(exc)}), 400
+            except Exception as exc:
+                logger.error("Error processing camera frame: %s", exc, exc_info=True)
+                return jsonify({"error": str(exc)}), 500
+            return jsonify({"ok": True})
+
+        if request.mimetype == "multipart/form-data":
+            upload = request.files.get("frame")
+            if upload is None:
+                return jsonify({"error": "no frame part"}), 400
+            try:
+                process_camera_bytes(request.form.get("sensor", "unknown"), upload.read())
+            except CameraDecodeError as exc:
+                return jsonify({"error": str(exc)}), 400
+            except Exception as exc:
+                logger.error("Error processing camera frame: %s", exc, exc_info=True)
+                return jsonify({"error": str(exc)}), 500
+            return jsonify({"ok": True})
+
         data = request.get_json(silent=True)
         if not data:
             return jsonify({"error": "no JSON body"}), 400
         try:
             process_camera_frame(data)
+        except CameraDecodeError as exc:
+            return jsonify({"error": str(exc)}), 400
         except Exception as exc:
             logger.error("Error processing camera frame: %s", exc, exc_info=True)
             return jsonify({"error": str(exc)}), 500
@@ -476,6 +783,12 @@ def _run_http_server():
     def api_status():
         return jsonify({
             "stats": _stats,
+            "inference": _inference_scheduler.stats,
+            "frame_ring": _detection_pool.ring_stats,
+            "influx_writer": influx_writer.stats if influx_writer is not None else {},
+            "spool": _spool.stats if _spool is not None else {},
+            "recording": _recording_policy.stats if _recording_policy is not None else {},
+            "state_publisher": _state_publisher.stats,
             "seat_states": ghost_detector.get_all_states(),
             "total_seats": TOTAL_SEATS,
         })
@@ -486,8 +799,10 @@ def _run_http_server():
             "status": "ok",
             "mqtt_connected": mqtt_client is not None and mqtt_client.is_connected(),
             "influxdb_connected": influx_write_api is not None,
-            "yolo_loaded": _yolo_model is not None,
-            "opencv_loaded": _cv2 is not None,
+            "detector_backend": _detection_pool.active_backend(),
+            "yolo_loaded": _detection_pool.active_backend() in ("yolo", "onnxruntime", "opencv_dnn"),
+            "opencv_loaded": _detection_pool.active_backend() == "opencv",
+            "detection_workers": _detection_pool.workers if _detection_pool.is_pooled else 0,
         })
 
     logger.info("HTTP fallback server starting on port %d", HTTP_FALLBACK_PORT)
@@ -496,17 +811,19 @@ def _run_http_server():
 def _log_stats_periodically(interval: float = 30.0):
     while True:
         time.sleep(interval)
-        states = ghost_detector.get_all_states()
-        occupied = sum(1 for v in states.values() if v == "occupied")
-        ghosts_s = sum(1 for v in states.values() if v == "suspected_ghost")
-        ghosts_c = sum(1 for v in states.values() if v == "confirmed_ghost")
+        counts = ghost_detector.state_counts()
+        occupied = counts["occupied"]
+        ghosts_s = counts["suspected_ghost"]
+        ghosts_c = counts["confirmed_ghost"]
         empty = TOTAL_SEATS - occupied - ghosts_s - ghosts_c
 
         logger.info(
-            "Stats | telemetry=%d camera=%d alerts=%d mqtt_pub=%d influx=%d | "
+            "Stats | telemetry=%d camera=%d gate_hit=%d gate_miss=%d alerts=%d mqtt_pub=%d influx=%d influx_q=%d influx_ms=%.1f | "
             "occupied=%d empty=%d suspected=%d confirmed=%d",
             _stats["telemetry_count"], _stats["camera_count"],
+            _stats["frame_gate_hits"], _stats["frame_gate_misses"],
             _stats["ghost_alerts"], _stats["mqtt_publishes"], _stats["influx_writes"],
+            _stats["influx_queue_depth"], _stats["influx_flush_ms"],
             occupied, empty, ghosts_s, ghosts_c,
         )
 
@@ -516,19 +833,15 @@ def main():
     print("=" * 60)
 
     mqtt_ok = _init_mqtt()
+    spool_ok = _init_spool()
     influx_ok = _init_influxdb()
-    _init_object_detector()
+    _detection_pool.start()
+    _inference_scheduler.start()
 
     print()
     print(f"  MQTT:     {'CONNECTED' if mqtt_ok else 'UNAVAILABLE (using HTTP fallback)'}")
-    print(f"  InfluxDB: {'CONNECTED' if influx_ok else 'UNAVAILABLE (writes disabled)'}")
-    print(f"  Detector: ", end="")
-    if _yolo_model is not None:
-        print("YOLOv8-nano")
-    elif _cv2 is not None:
-        print(f"OpenCV ({_cv2.__version__})")
-    else:
-        print("threshold-only fallback")
+    print(f"  InfluxDB: {'CONNECTED' if influx_ok else 'UNAVAILABLE (spooling to disk)' if spool_ok else 'UNAVAILABLE (writes disabled)'}")
+    print(f"  Detector: {_detection_pool.describe_backend()}")
     print(f"  HTTP API: http://0.0.0.0:{HTTP_FALLBACK_PORT}")
     print(f"  Seats:    {TOTAL_SEATS} across {len(ZONE_TO_SEATS)} zones")
     print("=" * 60)
@@ -537,8 +850,24 @@ def main():
     stats_thread = threading.Thread(target=_log_stats_periodically, daemon=True)
     stats_thread.start()
 
+    ghost_timer_thread = threading.Thread(target=_ghost_timer_loop, daemon=True)
+    ghost_timer_thread.start()
+
+    snapshot_thread = threading.Thread(target=_publish_snapshots_periodically, daemon=True)
+    snapshot_thread.start()
+
+    if spool_ok:
+        spool_thread = threading.Thread(target=_replay_spool_periodically, daemon=True)
+        spool_thread.start()
+
     def _shutdown(signum, frame):
         logger.info("Shutting down edge processor...")
+        _inference_scheduler.stop()
+        _detection_pool.stop()
+        if influx_writer is not None:
+            influx_writer.stop()
+        if _spool is not None:
+            _spool.close()
         if mqtt_client is not None:
             try:
                 mqtt_client.loop_stop()
@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config import RECORD_DEADBANDS, RECORD_HEARTBEAT_INTERVAL, RECORD_EXACT_FIELDS
+
+logger = logging.getLogger("recording_policy")
+
+class RecordingPolicy:
+
+    def __init__(
+        self,
+        deadbands: Optional[Dict[str, float]] = None,
+        heartbeat_interval: float = RECORD_HEARTBEAT_INTERVAL,
+        exact_fields: Tuple[str, ...] = RECORD_EXACT_FIELDS,
+    ):
+        self.deadbands = dict(RECORD_DEADBANDS if deadbands is None else deadbands)
+        self.heartbeat_interval = heartbeat_interval
+        self.exact_fields = tuple(exact_fields)
+
+        self._recorded: Dict[str, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "seen": 0,
+            "recorded": 0,
+            "changes": 0,
+            "heartbeats": 0,
+        }
+
+    def _changed(self, last: dict, update: dict) -> bool:
+        for name in self.exact_fields:
+            if update.get(name) != last.get(name):
+                return True
+        for name, band in self.deadbands.items():
+            if abs(float(update.get(name, 0)) - float(last.get(name, 0))) >= band:
+                return True
+        return False
+
+    def filter(self, updates: Dict[str, dict], now: Optional[float] = None) -> Dict[str, dict]:
+        selected = {}
+        with self._lock:
+            for seat_id, update in updates.items():
+                self.stats["seen"] += 1
+                ts = update.get("timestamp", now if now is not None else time.time())
+                previous = self._recorded.get(seat_id)
+
+                if previous is None or self._changed(previous[1], update):
+                    self.stats["changes"] += 1
+                elif ts - previous[0] >= self.heartbeat_interval:
+                    self.stats["heartbeats"] += 1
+                else:
+                    continue
+
+                self._recorded[seat_id] = (ts, update)
+                selected[seat_id] = update
+
+            self.stats["recorded"] += len(selected)
+        return selected
+
+    def forget(self, seat_id: str):
+        with self._lock:
+            self._recorded.pop(seat_id, None)
@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import (
+    SAMPLING_IDLE_INTERVAL,
+    SAMPLING_WATCH_INTERVAL,
+    SAMPLING_URGENT_INTERVAL,
+    SAMPLING_LEAD_TIME,
+)
+from ghost_detector import GhostDetector, SeatState
+
+logger = logging.getLogger("sampling")
+
+class SamplingController:
+
+    def __init__(
+        self,
+        ghost_detector: GhostDetector,
+        idle_interval: float = SAMPLING_IDLE_INTERVAL,
+        watch_interval: float = SAMPLING_WATCH_INTERVAL,
+        urgent_interval: float = SAMPLING_URGENT_INTERVAL,
+        lead_time: float = SAMPLING_LEAD_TIME,
+    ):
+        self.ghost_detector = ghost_detector
+        self.idle_interval = idle_interval
+        self.watch_interval = watch_interval
+        self.urgent_interval = urgent_interval
+        self.lead_time = lead_time
+
+        self._last_inferred: Dict[str, float] = {}
+        self._requested: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def interval_for_seats(self, seat_ids: List[str], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        interval = self.idle_interval
+        for seat_id in seat_ids:
+            state = self.ghost_detector.peek_state(seat_id)
+            if state in (SeatState.SUSPECTED_GHOST, SeatState.CONFIRMED_GHOST):
+                return self.urgent_interval
+            if state == SeatState.OCCUPIED:
+                remaining = self.ghost_detector.time_to_transition(seat_id, now)
+                if remaining is not None and remaining <= self.lead_time:
+                    return self.urgent_interval
+                interval = min(interval, self.watch_interval)
+        return interval
+
+    def should_infer(self, sensor_name: str, seat_ids: List[str], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        interval = self.interval_for_seats(seat_ids, now)
+        with self._lock:
+            last = self._last_inferred.get(sensor_name)
+            if last is not None and now - last < interval:
+                return False
+            self._last_inferred[sensor_name] = now
+            return True
+
+    def pending_rate_requests(self, sensors: Dict[str, List[str]], now: Optional[float] = None) -> Dict[str, float]:
+        now = time.time() if now is None else now
+        changes = {}
+        with self._lock:
+            for sensor_name, seat_ids in sensors.items():
+                interval = self.interval_for_seats(seat_ids, now)
+                if self._requested.get(sensor_name) != interval:
+                    changes[sensor_name] = interval
+        return changes
+
+    def mark_requested(self, sensor_name: str, interval: float):
+        with self._lock:
+            self._requested[sensor_name] = interval
+        logger.info("Camera sampling for %s -> every %.1fs", sensor_name, interval)
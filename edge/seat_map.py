@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import CAMERA_FRAME_SIZE, CAMERA_SEAT_POLYGONS, CAMERA_SEAT_MAP_FILE, SEAT_INDEX_CELL
+from sensor_fusion import CameraResult
+
+logger = logging.getLogger("seat_map")
+
+Polygon = Sequence[Tuple[float, float]]
+
+def best_camera_result(detections: Iterable[dict]) -> CameraResult:
+    best_person = CameraResult("empty", 0.0)
+    best_object = CameraResult("empty", 0.0)
+
+    for det in detections:
+        cls = det["class"]
+        conf = det["confidence"]
+        if cls == "person" and conf > best_person.confidence:
+            best_person = CameraResult("person", conf)
+        elif cls != "person" and cls != "empty" and conf > best_object.confidence:
+            best_object = CameraResult(cls, conf)
+
+    best = best_person if best_person.confidence > best_object.confidence else best_object
+    if best.confidence == 0.0:
+        best = CameraResult("empty", 0.0)
+    return best
+
+def _point_in_polygon(x: float, y: float, poly: Polygon) -> bool:
+    inside = False
+    n = len(poly)
+    j = n - 1
+    for i in range(n):
+        xi, yi = poly[i]
+        xj, yj = poly[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+class SeatIndex:
+
+    def __init__(self, polygons: Dict[str, Polygon], cell: float = SEAT_INDEX_CELL):
+        self.cell = cell
+        self.seat_ids: List[str] = list(polygons)
+        self._polygons: List[Polygon] = [polygons[s] for s in self.seat_ids]
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+
+        for idx, poly in enumerate(self._polygons):
+            xs = [p[0] for p in poly]
+            ys = [p[1] for p in poly]
+            for gx in range(int(min(xs) // cell), int(max(xs) // cell) + 1):
+                for gy in range(int(min(ys) // cell), int(max(ys) // cell) + 1):
+                    self._grid.setdefault((gx, gy), []).append(idx)
+
+    def seat_at(self, x: float, y: float) -> Optional[str]:
+        for idx in self._grid.get((int(x // self.cell), int(y // self.cell)), ()):
+            if _point_in_polygon(x, y, self._polygons[idx]):
+                return self.seat_ids[idx]
+        return None
+
+    def assign(
+        self,
+        detections: Sequence[dict],
+        frame_size: Optional[Tuple[int, int]] = None,
+    ) -> Dict[str, CameraResult]:
+        width, height = frame_size or CAMERA_FRAME_SIZE
+        per_seat: Dict[str, List[dict]] = {}
+
+        for det in detections:
+            x1, y1, x2, y2 = det["bbox"]
+            if x2 <= x1 or y2 <= y1:
+                continue
+            seat_id = self.seat_at((x1 + x2) / 2 / width, (y1 + y2) / 2 / height)
+            if seat_id is not None:
+                per_seat.setdefault(seat_id, []).append(det)
+
+        return {seat_id: best_camera_result(dets) for seat_id, dets in per_seat.items()}
+
+def _normalise(polygon: Polygon) -> Polygon:
+    if all(0.0 <= x <= 1.0 and 0.0 <= y <= 1.0 for x, y in polygon):
+        return [(float(x), float(y)) for x, y in polygon]
+    width, height = CAMERA_FRAME_SIZE
+    return [(x / width, y / height) for x, y in polygon]
+
+def _load_polygons() -> Dict[str, Dict[str, Polygon]]:
+    polygons = dict(CAMERA_SEAT_POLYGONS)
+    if CAMERA_SEAT_MAP_FILE and os.path.exists(CAMERA_SEAT_MAP_FILE):
+        try:
+            with open(CAMERA_SEAT_MAP_FILE) as f:
+                polygons.update(json.load(f))
+            logger.info("Loaded seat calibration from %s", CAMERA_SEAT_MAP_FILE)
+        except (OSError, ValueError) as exc:
+            logger.warning("Cannot load seat calibration %s: %s", CAMERA_SEAT_MAP_FILE, exc)
+    return polygons
+
+class SeatMap:
+
+    def __init__(self, polygons: Optional[Dict[str, Dict[str, Polygon]]] = None):
+        polygons = _load_polygons() if polygons is None else polygons
+        self._indexes: Dict[str, SeatIndex] = {
+            key: SeatIndex({seat_id: _normalise(poly) for seat_id, poly in seats.items()})
+            for key, seats in polygons.items()
+        }
+
+    def index_for(self, sensor_name: str) -> Optional[SeatIndex]:
+        index = self._indexes.get(sensor_name)
+        if index is not None:
+            return index
+        key = "back" if "back" in sensor_name.lower() else "front"
+        return self._indexes.get(key)
@@ -1,12 +1,70 @@
 
 import logging
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Dict, Optional
 
-from config import CAMERA_WEIGHT, RADAR_WEIGHT, AGREEMENT_BONUS, PRESENCE_THRESHOLD, MOTION_THRESHOLD
+import numpy as np
+
+from config import (
+    CAMERA_WEIGHT,
+    RADAR_WEIGHT,
+    AGREEMENT_BONUS,
+    PRESENCE_THRESHOLD,
+    MOTION_THRESHOLD,
+)
 
 logger = logging.getLogger("sensor_fusion")
 
+OBJECT_TYPES = (
+    "empty",
+    "person",
+    "object",
+    "unknown",
+    "backpack",
+    "umbrella",
+    "handbag",
+    "tie",
+    "suitcase",
+    "bottle",
+    "chair",
+    "dining table",
+    "laptop",
+    "mouse",
+    "keyboard",
+    "book",
+)
+_OBJECT_TYPE_CODES: Dict[str, int] = {name: i for i, name in enumerate(OBJECT_TYPES)}
+
+EMPTY_CODE = _OBJECT_TYPE_CODES["empty"]
+PERSON_CODE = _OBJECT_TYPE_CODES["person"]
+OBJECT_CODE = _OBJECT_TYPE_CODES["object"]
+UNKNOWN_CODE = _OBJECT_TYPE_CODES["unknown"]
+
+FUSED_DTYPE = np.dtype([
+    ("occupancy_score", np.float64),
+    ("object_code", np.int16),
+    ("confidence", np.float64),
+    ("is_present", np.bool_),
+    ("has_motion", np.bool_),
+    ("radar_presence", np.float64),
+    ("radar_motion", np.float64),
+    ("radar_micro_motion", np.bool_),
+])
+
+def object_type_code(name: str) -> int:
+    return _OBJECT_TYPE_CODES.get(name, UNKNOWN_CODE)
+
+def object_type_name(code: int) -> str:
+    return OBJECT_TYPES[code] if 0 <= code < len(OBJECT_TYPES) else "unknown"
+
+def _round4(values: np.ndarray) -> np.ndarray:
+    out = np.round(values, 4)
+    scaled = values * 1e4
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        out[i] = round(float(values[i]), 4)
+    return out
+
 @dataclass
 class CameraResult:
     object_type: str = "empty"
@@ -29,6 +87,19 @@ class FusedResult:
     radar_motion: float = 0.0
     radar_micro_motion: bool = False
 
+    @classmethod
+    def from_record(cls, rec) -> "FusedResult":
+        return cls(
+            occupancy_score=float(rec["occupancy_score"]),
+            object_type=object_type_name(int(rec["object_code"])),
+            confidence=float(rec["confidence"]),
+            is_present=bool(rec["is_present"]),
+            has_motion=bool(rec["has_motion"]),
+            radar_presence=float(rec["radar_presence"]),
+            radar_motion=float(rec["radar_motion"]),
+            radar_micro_motion=bool(rec["radar_micro_motion"]),
+        )
+
 class SensorFusion:
 
     def __init__(
@@ -111,3 +182,57 @@ class SensorFusion:
         )
 
         return result
+
+    def fuse_batch(
+        self,
+        cam_confidence: np.ndarray,
+        cam_type: np.ndarray,
+        radar_presence: np.ndarray,
+        radar_motion: np.ndarray,
+        radar_micro: np.ndarray,
+        has_camera: Optional[np.ndarray] = None,
+        has_radar: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        n = len(cam_confidence)
+        has_cam = np.ones(n, dtype=bool) if has_camera is None else np.asarray(has_camera, dtype=bool)
+        has_rad = np.ones(n, dtype=bool) if has_radar is None else np.asarray(has_radar, dtype=bool)
+
+        cam_conf = np.where(has_cam, np.clip(np.asarray(cam_confidence, dtype=np.float64), 0.0, 1.0), 0.0)
+        cam_code = np.where(has_cam, np.asarray(cam_type, dtype=np.int16), EMPTY_CODE)
+        radar_pres = np.where(has_rad, np.clip(np.asarray(radar_presence, dtype=np.float64), 0.0, 1.0), 0.0)
+        radar_mot = np.where(has_rad, np.clip(np.asarray(radar_motion, dtype=np.float64), 0.0, 1.0), 0.0)
+        micro = has_rad & np.asarray(radar_micro, dtype=bool)
+
+        occupancy = self.camera_weight * cam_conf + self.radar_weight * radar_pres
+
+        camera_says_present = (cam_code != EMPTY_CODE) & (cam_conf > 0.3)
+        radar_says_present = radar_pres >= self.presence_threshold
+
+        both = has_cam & has_rad
+        agree = both & camera_says_present & radar_says_present
+        disagree_absent = both & ~camera_says_present & ~radar_says_present
+        occupancy = np.where(agree, occupancy + self.agreement_bonus, occupancy)
+        occupancy = np.where(disagree_absent,
+                             np.maximum(0.0, occupancy - self.agreement_bonus * 0.5), occupancy)
+        occupancy = np.clip(occupancy, 0.0, 1.0)
+
+        final_code = np.where(
+            camera_says_present, cam_code,
+            np.where(radar_says_present, np.where(micro, PERSON_CODE, OBJECT_CODE), EMPTY_CODE),
+        )
+
+        has_motion = (radar_mot > MOTION_THRESHOLD) | micro
+        has_motion |= has_cam & (cam_code == PERSON_CODE) & (cam_conf > 0.5)
+
+        out = np.empty(n, dtype=FUSED_DTYPE)
+        out["occupancy_score"] = _round4(occupancy)
+        out["object_code"] = final_code
+        out["confidence"] = _round4(np.where(has_cam, cam_conf, radar_pres))
+        out["is_present"] = occupancy >= self.presence_threshold
+        out["has_motion"] = has_motion
+        out["radar_presence"] = _round4(radar_pres)
+        out["radar_motion"] = _round4(radar_mot)
+        out["radar_micro_motion"] = micro
+
+        logger.debug("Fused batch of %d seats (%d present)", n, int(out["is_present"].sum()))
+        return out
@@ -0,0 +1,258 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from config import (
+    SPOOL_DIR,
+    SPOOL_SEGMENT_BYTES,
+    SPOOL_MAX_BYTES,
+    SPOOL_FSYNC_INTERVAL,
+    SPOOL_REPLAY_BATCH,
+)
+
+logger = logging.getLogger("spool")
+
+_SEGMENT_PREFIX = "seg-"
+_SEGMENT_SUFFIX = ".lp"
+_CURSOR_FILE = "cursor"
+_QUARANTINE_FILE = "rejected.lp"
+
+class LineSpool:
+
+    def __init__(
+        self,
+        directory: str = SPOOL_DIR,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        max_bytes: int = SPOOL_MAX_BYTES,
+        fsync_interval: float = SPOOL_FSYNC_INTERVAL,
+    ):
+        self.directory = directory
+        self.segment_bytes = max(1024, segment_bytes)
+        self.max_bytes = max(self.segment_bytes, max_bytes)
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._segments: List[Tuple[int, int]] = []
+        self._next_seq = 0
+        self._file = None
+        self._file_bytes = 0
+        self._last_fsync = 0.0
+        self._dirty = False
+
+        self.stats = {
+            "spooled": 0,
+            "replayed": 0,
+            "segments": 0,
+            "bytes": 0,
+            "evicted_segments": 0,
+            "evicted_bytes": 0,
+            "quarantined": 0,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{seq:012d}{_SEGMENT_SUFFIX}")
+
+    def _scan(self):
+        for name in os.listdir(self.directory):
+            if not (name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)):
+                continue
+            try:
+                seq = int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            size = os.path.getsize(os.path.join(self.directory, name))
+            if size == 0:
+                os.remove(os.path.join(self.directory, name))
+                continue
+            self._segments.append((seq, size))
+        self._segments.sort()
+        self._next_seq = self._segments[-1][0] + 1 if self._segments else 0
+        self._refresh_stats()
+        if self._segments:
+            logger.info("Spool %s holds %d segment(s), %d bytes awaiting replay",
+                        self.directory, len(self._segments), self.stats["bytes"])
+
+    def _refresh_stats(self):
+        self.stats["segments"] = len(self._segments)
+        self.stats["bytes"] = sum(size for _, size in self._segments)
+
+    @property
+    def pending_bytes(self) -> int:
+        return self.stats["bytes"]
+
+    def append(self, lines: Sequence[str]):
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None or self._file_bytes >= self.segment_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file_bytes += len(data)
+            seq, size = self._segments[-1]
+            self._segments[-1] = (seq, size + len(data))
+            self._dirty = True
+            self.stats["spooled"] += len(lines)
+
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                self._sync(now)
+            self._evict()
+            self._refresh_stats()
+
+    def _sync(self, now: Optional[float] = None):
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_fsync = time.monotonic() if now is None else now
+
+    def _rotate(self):
+        self._close_current()
+        seq = self._next_seq
+        self._next_seq += 1
+        self._file = open(self._path(seq), "ab")
+        self._file_bytes = 0
+        self._segments.append((seq, 0))
+
+    def _close_current(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+        if self._segments and self._segments[-1][1] == 0:
+            seq, _ = self._segments.pop()
+            os.remove(self._path(seq))
+
+    def _evict(self):
+        total = sum(size for _, size in self._segments)
+        while total > self.max_bytes and len(self._segments) > 1:
+            seq, size = self._segments.pop(0)
+            try:
+                os.remove(self._path(seq))
+            except OSError as exc:
+                logger.warning("Cannot evict spool segment %d: %s", seq, exc)
+            self._clear_cursor(seq)
+            total -= size
+            self.stats["evicted_segments"] += 1
+            self.stats["evicted_bytes"] += size
+            logger.warning("Spool over %d bytes; evicted oldest segment %d (%d bytes)",
+                           self.max_bytes, seq, size)
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._close_current()
+            self._refresh_stats()
+
+    def _read_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, _CURSOR_FILE)) as f:
+                seq, offset = f.read().split()
+            return int(seq), int(offset)
+        except (OSError, ValueError):
+            return -1, 0
+
+    def _write_cursor(self, seq: int, offset: int):
+        path = os.path.join(self.directory, _CURSOR_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{seq} {offset}")
+        os.replace(tmp, path)
+
+    def _clear_cursor(self, seq: int):
+        if self._read_cursor()[0] == seq:
+            try:
+                os.remove(os.path.join(self.directory, _CURSOR_FILE))
+            except OSError:
+                pass
+
+    def _quarantine(self, chunk: List[bytes], exc: Exception):
+        path = os.path.join(self.directory, _QUARANTINE_FILE)
+        self.stats["quarantined"] += len(chunk)
+        try:
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+                logger.warning("Spool quarantine full; discarding %d rejected line(s): %s", len(chunk), exc)
+                return
+            with open(path, "ab") as f:
+                f.writelines(chunk)
+        except OSError as err:
+            logger.warning("Cannot quarantine %d rejected line(s): %s", len(chunk), err)
+            return
+        logger.warning("InfluxDB rejected %d spooled line(s); moved to %s: %s", len(chunk), path, exc)
+
+    def _write_chunk(
+        self,
+        write_lines: Callable[[List[str]], None],
+        chunk: List[bytes],
+        is_rejected: Optional[Callable[[Exception], bool]],
+    ) -> int:
+        try:
+            write_lines([line.decode("utf-8", "replace").rstrip("\n") for line in chunk])
+            return len(chunk)
+        except Exception as exc:
+            if is_rejected is None or not is_rejected(exc):
+                raise
+            if len(chunk) == 1:
+                self._quarantine(chunk, exc)
+                return 0
+        half = len(chunk) // 2
+        return (self._write_chunk(write_lines, chunk[:half], is_rejected)
+                + self._write_chunk(write_lines, chunk[half:], is_rejected))
+
+    def replay(
+        self,
+        write_lines: Callable[[List[str]], None],
+        batch_lines: int = SPOOL_REPLAY_BATCH,
+        is_rejected: Optional[Callable[[Exception], bool]] = None,
+    ) -> int:
+        with self._replay_lock:
+            with self._lock:
+                if self._file is not None and self._file_bytes > 0:
+                    self._close_current()
+                    self._refresh_stats()
+                segments = [seq for seq, _ in self._segments]
+
+            replayed = 0
+            for seq in segments:
+                cursor_seq, offset = self._read_cursor()
+                if cursor_seq != seq:
+                    offset = 0
+                try:
+                    with open(self._path(seq), "rb") as f:
+                        f.seek(offset)
+                        while True:
+                            chunk = [f.readline() for _ in range(batch_lines)]
+                            chunk = [line for line in chunk if line]
+                            if not chunk:
+                                break
+                            written = self._write_chunk(write_lines, chunk, is_rejected)
+                            replayed += written
+                            self.stats["replayed"] += written
+                            offset = f.tell()
+                            self._write_cursor(seq, offset)
+                except FileNotFoundError:
+                    continue
+
+                with self._lock:
+                    self._segments = [(s, size) for s, size in self._segments if s != seq]
+                    try:
+                        os.remove(self._path(seq))
+                    except OSError:
+                        pass
+                    self._clear_cursor(seq)
+                    self._refresh_stats()
+
+            if replayed:
+                logger.info("Replayed %d spooled line(s) to InfluxDB", replayed)
+            return replayed
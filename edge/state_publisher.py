@@ -0,0 +1,219 @@
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import (
+    MQTT_TOPIC_STATE_SEAT,
+    MQTT_TOPIC_STATE_ZONE,
+    MQTT_TOPIC_STATE_SNAPSHOT,
+    SEAT_TO_ZONE,
+    ZONE_TO_SEATS,
+    STATE_PUBLISH_QOS,
+    STATE_PUBLISH_PER_SEAT,
+    STATE_PUBLISH_ZONE_BATCH,
+    STATE_PUBLISH_DEADBANDS,
+)
+from ghost_detector import STATES
+
+logger = logging.getLogger("state_publisher")
+
+_VOLATILE_FIELDS = ("timestamp",)
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_STATES = [state.value for state in STATES]
+SNAPSHOT_COLUMNS = (
+    ("zone", "zone_id", ""),
+    ("occupancy", "occupancy_score", 0.0),
+    ("confidence", "confidence", 0.0),
+    ("radar_presence", "radar_presence", 0.0),
+    ("object_type", "object_type", "empty"),
+    ("present", "is_present", False),
+    ("motion", "has_motion", False),
+    ("updated", "timestamp", 0),
+)
+
+class StatePublisher:
+
+    def __init__(
+        self,
+        qos: int = STATE_PUBLISH_QOS,
+        per_seat: bool = STATE_PUBLISH_PER_SEAT,
+        zone_batch: bool = STATE_PUBLISH_ZONE_BATCH,
+        deadbands: Optional[Dict[str, float]] = None,
+    ):
+        if qos not in (0, 1, 2):
+            raise ValueError(f"MQTT QoS must be 0, 1 or 2, got {qos!r}")
+        self.qos = qos
+        self.per_seat = per_seat
+        self.zone_batch = zone_batch
+        self.deadbands = dict(STATE_PUBLISH_DEADBANDS if deadbands is None else deadbands)
+
+        self._seat_topics: Dict[str, str] = {
+            seat_id: MQTT_TOPIC_STATE_SEAT.replace("{seat_id}", seat_id) for seat_id in SEAT_TO_ZONE
+        }
+        self._zone_topics: Dict[str, str] = {
+            zone_id: MQTT_TOPIC_STATE_ZONE.replace("{zone_id}", zone_id) for zone_id in ZONE_TO_SEATS
+        }
+        self._published: Dict[str, dict] = {}
+        self._seat_seq: Dict[str, int] = {}
+        self._zone_seq: Dict[str, int] = {}
+        self.epoch = int(time.time() * 1000)
+        self._snapshot_seq = 0
+        self._snapshot_dirty = False
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+
+        self.stats = {
+            "seen": 0,
+            "unchanged": 0,
+            "seat_messages": 0,
+            "zone_messages": 0,
+            "snapshots": 0,
+        }
+
+    def seat_topic(self, seat_id: str) -> str:
+        topic = self._seat_topics.get(seat_id)
+        if topic is None:
+            topic = self._seat_topics.setdefault(seat_id, MQTT_TOPIC_STATE_SEAT.replace("{seat_id}", seat_id))
+        return topic
+
+    def zone_topic(self, zone_id: str) -> str:
+        topic = self._zone_topics.get(zone_id)
+        if topic is None:
+            topic = self._zone_topics.setdefault(zone_id, MQTT_TOPIC_STATE_ZONE.replace("{zone_id}", zone_id))
+        return topic
+
+    def _same(self, previous: Optional[dict], update: dict) -> bool:
+        if previous is None or len(previous) != len(update):
+            return False
+        for key, value in update.items():
+            if key in _VOLATILE_FIELDS:
+                continue
+            band = self.deadbands.get(key)
+            if band is not None and isinstance(value, float):
+                last = previous.get(key)
+                if isinstance(last, (int, float)) and abs(value - last) < band:
+                    continue
+                return False
+            if previous.get(key) != value:
+                return False
+        return True
+
+    def changed(self, updates: Dict[str, dict]) -> Dict[str, dict]:
+        with self._lock:
+            self.stats["seen"] += len(updates)
+            delta = {
+                seat_id: update for seat_id, update in updates.items()
+                if not self._same(self._published.get(seat_id), update)
+            }
+            self.stats["unchanged"] += len(updates) - len(delta)
+        return delta
+
+    def publish(self, client, updates: Dict[str, dict]) -> int:
+        with self._publish_lock:
+            return self._publish(client, updates)
+
+    def _publish(self, client, updates: Dict[str, dict]) -> int:
+        delta = self.changed(updates)
+        if not delta:
+            return 0
+        if client is None or not client.is_connected():
+            logger.debug("MQTT unavailable; %d seat change(s) held back", len(delta))
+            return 0
+
+        with self._lock:
+            seqs = {seat_id: self._seat_seq.get(seat_id, 0) + 1 for seat_id in delta}
+
+        published: List[str] = []
+        count = 0
+
+        if self.per_seat:
+            for seat_id, update in delta.items():
+                try:
+                    payload = {**update, "epoch": self.epoch, "seq": seqs[seat_id]}
+                    client.publish(self.seat_topic(seat_id), json.dumps(payload), qos=self.qos)
+                    published.append(seat_id)
+                    count += 1
+                except Exception as exc:
+                    logger.warning("MQTT publish failed for seat %s: %s", seat_id, exc)
+            self.stats["seat_messages"] += count
+
+        if self.zone_batch:
+            by_zone: Dict[str, List[str]] = {}
+            for seat_id, update in delta.items():
+                by_zone.setdefault(update.get("zone_id") or SEAT_TO_ZONE.get(seat_id, ""), []).append(seat_id)
+            zone_published = []
+            for zone_id, seat_ids in by_zone.items():
+                with self._lock:
+                    zone_seq = self._zone_seq.get(zone_id, 0) + 1
+                payload = {
+                    "zone": zone_id,
+                    "delta": True,
+                    "epoch": self.epoch,
+                    "seq": zone_seq,
+                    "timestamp": max(delta[s].get("timestamp", 0) for s in seat_ids),
+                    "seats": [{"id": s, **delta[s], "seq": seqs[s]} for s in seat_ids],
+                }
+                try:
+                    client.publish(self.zone_topic(zone_id), json.dumps(payload), qos=self.qos)
+                    with self._lock:
+                        self._zone_seq[zone_id] = zone_seq
+                    zone_published.extend(seat_ids)
+                    count += 1
+                    self.stats["zone_messages"] += 1
+                except Exception as exc:
+                    logger.warning("MQTT publish failed for zone %s: %s", zone_id, exc)
+            if not self.per_seat:
+                published = zone_published
+
+        with self._lock:
+            for seat_id in published:
+                self._published[seat_id] = delta[seat_id]
+                self._seat_seq[seat_id] = seqs[seat_id]
+            if published:
+                self._snapshot_dirty = True
+        return count
+
+    def snapshot(self, now: Optional[float] = None) -> dict:
+        with self._lock:
+            seat_ids = sorted(self._published)
+            rows = [self._published[seat_id] for seat_id in seat_ids]
+            state_codes = {name: i for i, name in enumerate(SNAPSHOT_STATES)}
+            seats = {
+                "id": seat_ids,
+                "seq": [self._seat_seq[seat_id] for seat_id in seat_ids],
+                "state": [state_codes.get(row.get("state"), -1) for row in rows],
+            }
+            for column, field, default in SNAPSHOT_COLUMNS:
+                seats[column] = [row.get(field, default) for row in rows]
+            self._snapshot_seq += 1
+            return {
+                "version": SNAPSHOT_VERSION,
+                "epoch": self.epoch,
+                "seq": self._snapshot_seq,
+                "timestamp": time.time() if now is None else now,
+                "states": SNAPSHOT_STATES,
+                "zones": dict(self._zone_seq),
+                "seats": seats,
+            }
+
+    def publish_snapshot(self, client, force: bool = False) -> bool:
+        if client is None or not client.is_connected():
+            return False
+        with self._lock:
+            if not (self._snapshot_dirty or force):
+                return False
+            self._snapshot_dirty = False
+        payload = json.dumps(self.snapshot(), separators=(",", ":"))
+        try:
+            client.publish(MQTT_TOPIC_STATE_SNAPSHOT, payload, qos=1, retain=True)
+        except Exception as exc:
+            with self._lock:
+                self._snapshot_dirty = True
+            logger.warning("MQTT publish failed for state snapshot: %s", exc)
+            return False
+        self.stats["snapshots"] += 1
+        logger.debug("Published state snapshot (%d bytes)", len(payload))
+        return True
@@ -0,0 +1,130 @@
+import struct
+import time
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from sensor_fusion import object_type_code
+
+TELEMETRY_MAGIC = b"LTT"
+TELEMETRY_VERSION = 1
+
+_HEADER = struct.Struct("<3sBHHd8s24s")
+HEADER_SIZE = _HEADER.size
+
+FLAG_MICRO_MOTION = 0x01
+
+SEAT_RECORD_DTYPE = np.dtype([
+    ("seat", "<u2"),
+    ("presence", "<f4"),
+    ("motion", "<f4"),
+    ("confidence", "<f4"),
+    ("object_code", "<i2"),
+    ("flags", "u1"),
+    ("reserved", "u1"),
+])
+
+class TelemetryDecodeError(ValueError):
+    pass
+
+@dataclass
+class TelemetryBatch:
+    zone_id: str
+    sensor: str
+    timestamp: float
+    seat_ids: List[str]
+    presence: np.ndarray
+    motion: np.ndarray
+    micro_motion: np.ndarray
+    object_code: np.ndarray
+    confidence: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.seat_ids)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "TelemetryBatch":
+        seats = data.get("seats", {})
+        seat_ids = list(seats)
+        n = len(seat_ids)
+        presence = np.zeros(n, dtype=np.float64)
+        motion = np.zeros(n, dtype=np.float64)
+        micro = np.zeros(n, dtype=bool)
+        codes = np.zeros(n, dtype=np.int16)
+        confidence = np.zeros(n, dtype=np.float64)
+        for i, seat_id in enumerate(seat_ids):
+            info = seats[seat_id]
+            presence[i] = float(info.get("presence", 0))
+            motion[i] = float(info.get("motion", 0))
+            micro[i] = bool(info.get("micro_motion", False))
+            codes[i] = object_type_code(info.get("object_type", "empty"))
+            confidence[i] = float(info.get("confidence", 0))
+        return cls(
+            zone_id=data.get("zone_id", ""),
+            sensor=data.get("sensor", "unknown"),
+            timestamp=data.get("timestamp", time.time()),
+            seat_ids=seat_ids,
+            presence=presence,
+            motion=motion,
+            micro_motion=micro,
+            object_code=codes,
+            confidence=confidence,
+        )
+
+def _seat_number(seat_id: str) -> int:
+    digits = "".join(ch for ch in seat_id if ch.isdigit())
+    if not digits:
+        raise ValueError(f"Seat id {seat_id!r} has no numeric part")
+    return int(digits)
+
+def encode_telemetry(batch: TelemetryBatch) -> bytes:
+    n = len(batch)
+    records = np.zeros(n, dtype=SEAT_RECORD_DTYPE)
+    records["seat"] = [_seat_number(s) for s in batch.seat_ids]
+    records["presence"] = batch.presence
+    records["motion"] = batch.motion
+    records["confidence"] = batch.confidence
+    records["object_code"] = batch.object_code
+    records["flags"] = np.where(batch.micro_motion, FLAG_MICRO_MOTION, 0)
+    header = _HEADER.pack(
+        TELEMETRY_MAGIC, TELEMETRY_VERSION, n, 0, float(batch.timestamp),
+        batch.zone_id.encode("ascii"), batch.sensor.encode("ascii"),
+    )
+    return header + records.tobytes()
+
+def decode_telemetry(payload: bytes) -> TelemetryBatch:
+    if len(payload) < HEADER_SIZE:
+        raise TelemetryDecodeError(f"Telemetry payload too short ({len(payload)} bytes)")
+    magic, version, count, _flags, timestamp, zone_raw, sensor_raw = _HEADER.unpack_from(payload)
+    if magic != TELEMETRY_MAGIC:
+        raise TelemetryDecodeError("Not a binary telemetry payload")
+    if version != TELEMETRY_VERSION:
+        raise TelemetryDecodeError(f"Unsupported telemetry version {version}")
+    expected = HEADER_SIZE + count * SEAT_RECORD_DTYPE.itemsize
+    if len(payload) < expected:
+        raise TelemetryDecodeError(f"Telemetry payload truncated ({len(payload)} of {expected} bytes)")
+
+    try:
+        zone_id = zone_raw.rstrip(b"\0").decode("ascii")
+        sensor = sensor_raw.rstrip(b"\0").decode("ascii")
+    except UnicodeDecodeError as exc:
+        raise TelemetryDecodeError(f"Telemetry zone/sensor is not ASCII: {exc}") from exc
+
+    records = np.frombuffer(payload, dtype=SEAT_RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+    if len(np.unique(records["seat"])) != count:
+        raise TelemetryDecodeError("Telemetry payload repeats a seat")
+    return TelemetryBatch(
+        zone_id=zone_id,
+        sensor=sensor,
+        timestamp=timestamp,
+        seat_ids=[f"S{n}" for n in records["seat"].tolist()],
+        presence=np.round(records["presence"].astype(np.float64), 6),
+        motion=np.round(records["motion"].astype(np.float64), 6),
+        micro_motion=(records["flags"] & FLAG_MICRO_MOTION).astype(bool),
+        object_code=records["object_code"].astype(np.int16),
+        confidence=np.round(records["confidence"].astype(np.float64), 6),
+    )
+
+def is_binary_telemetry(payload: Sequence) -> bool:
+    return bytes(payload[:3]) == TELEMETRY_MAGIC
@@ -0,0 +1,31 @@
+import gzip
+
+import pytest
+
+from batch_ingest import IngestError, decompress_body
+
+def test_gzip_reads_every_member():
+    body = gzip.compress(b'[{"type": ') + gzip.compress(b'"camera"}]')
+
+    assert decompress_body(body, "gzip") == b'[{"type": "camera"}]'
+
+def test_gzip_limit_spans_members():
+    body = gzip.compress(b"a" * 60) + gzip.compress(b"b" * 60)
+
+    with pytest.raises(IngestError):
+        decompress_body(body, "gzip", max_bytes=100)
+
+def test_zstd_reads_every_frame():
+    zstd = pytest.importorskip("zstandard")
+    compressor = zstd.ZstdCompressor()
+    body = compressor.compress(b'[{"type": ') + compressor.compress(b'"camera"}]')
+
+    assert decompress_body(body, "zstd") == b'[{"type": "camera"}]'
+
+def test_zstd_limit_spans_frames():
+    zstd = pytest.importorskip("zstandard")
+    compressor = zstd.ZstdCompressor()
+    body = compressor.compress(b"a" * 60) + compressor.compress(b"b" * 60)
+
+    with pytest.raises(IngestError):
+        decompress_body(body, "zstd", max_bytes=100)
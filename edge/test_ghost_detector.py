@@ -0,0 +1,29 @@
+import numpy as np
+
+from ghost_detector import GhostDetector, SeatState
+from sensor_fusion import FUSED_DTYPE
+
+def _fused(present):
+    fused = np.zeros(len(present), dtype=FUSED_DTYPE)
+    fused["is_present"] = present
+    fused["occupancy_score"] = np.where(present, 0.9, 0.0)
+    return fused
+
+def test_update_many_repeated_seat_ids_last_wins():
+    detector = GhostDetector()
+    detector.update_many(["S1", "S2", "S1"], _fused([True, True, False]), now=100.0)
+
+    assert detector.get_state("S1") == SeatState.EMPTY
+    assert detector.get_state("S2") == SeatState.OCCUPIED
+    counts = detector.state_counts()
+    assert all(n >= 0 for n in counts.values())
+    assert sum(counts.values()) == detector.seat_count
+
+def test_update_many_repeated_seat_ids_counts_stay_consistent():
+    detector = GhostDetector()
+    detector.update_many(["S1", "S1"], _fused([True, True]), now=100.0)
+    detector.update_many(["S1", "S1"], _fused([False, True]), now=101.0)
+
+    assert detector.get_state("S1") == SeatState.OCCUPIED
+    assert detector.state_counts()[SeatState.OCCUPIED.value] == 1
+    assert sum(detector.state_counts().values()) == 1
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from config import (
+    TRACKER_DETECT_EVERY,
+    TRACKER_IOU_THRESHOLD,
+    TRACKER_MAX_MISSED,
+    TRACKER_CONFIDENCE_DECAY,
+    TRACKER_MIN_CONFIDENCE,
+)
+
+logger = logging.getLogger("tracker")
+
+@dataclass
+class Track:
+    track_id: int
+    label: str
+    bbox: np.ndarray
+    velocity: np.ndarray
+    confidence: float
+    anchor: Optional[np.ndarray] = None
+    track_confidence: float = 1.0
+    hits: int = 1
+    missed: int = 0
+    last_update: float = 0.0
+
+    def to_detection(self) -> dict:
+        return {
+            "class": self.label,
+            "confidence": self.confidence,
+            "bbox": [round(float(c), 1) for c in self.bbox],
+            "track_id": self.track_id,
+        }
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    same = np.all(a[:, None, :] == b[None, :, :], axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = np.where(union > 0, inter / union, same.astype(np.float32))
+    return iou.astype(np.float32)
+
+class ObjectTracker:
+
+    def __init__(
+        self,
+        detect_every: int = TRACKER_DETECT_EVERY,
+        iou_threshold: float = TRACKER_IOU_THRESHOLD,
+        max_missed: int = TRACKER_MAX_MISSED,
+        confidence_decay: float = TRACKER_CONFIDENCE_DECAY,
+        min_confidence: float = TRACKER_MIN_CONFIDENCE,
+    ):
+        self.detect_every = max(1, detect_every)
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+
+        self._tracks: List[Track] = []
+        self._next_id = 1
+        self._frames_since_detection = 0
+        self._last_time: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def needs_detection(self) -> bool:
+        with self._lock:
+            active = [t for t in self._tracks if t.missed == 0]
+            if not active or self._last_time is None:
+                return True
+            if self._frames_since_detection + 1 >= self.detect_every:
+                return True
+            return min(t.track_confidence for t in active) < self.min_confidence
+
+    def predict(self, now: Optional[float] = None) -> List[dict]:
+        now = time.time() if now is None else now
+        with self._lock:
+            dt = 0.0 if self._last_time is None else max(0.0, now - self._last_time)
+            for t in self._tracks:
+                t.bbox = t.bbox + np.tile(t.velocity * dt, 2)
+                t.track_confidence *= self.confidence_decay
+            self._last_time = now
+            self._frames_since_detection += 1
+            return [t.to_detection() for t in self._tracks if t.missed == 0]
+
+    def update(self, detections: List[dict], now: Optional[float] = None) -> List[dict]:
+        now = time.time() if now is None else now
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(-1, 4)
+
+        with self._lock:
+            track_boxes = np.array([t.bbox for t in self._tracks], dtype=np.float32).reshape(-1, 4)
+            iou = iou_matrix(track_boxes, boxes)
+
+            matched_tracks = set()
+            matched_dets = set()
+            if iou.size:
+                order = np.argsort(-iou, axis=None)
+                for flat in order:
+                    ti, di = divmod(int(flat), iou.shape[1])
+                    if iou[ti, di] < self.iou_threshold:
+                        break
+                    if ti in matched_tracks or di in matched_dets:
+                        continue
+                    matched_tracks.add(ti)
+                    matched_dets.add(di)
+                    self._refresh(self._tracks[ti], detections[di], boxes[di], now)
+
+            survivors = []
+            for i, t in enumerate(self._tracks):
+                if i not in matched_tracks:
+                    t.missed += 1
+                    t.track_confidence *= self.confidence_decay
+                    if t.missed > self.max_missed:
+                        logger.debug("Dropping track %d (%s)", t.track_id, t.label)
+                        continue
+                survivors.append(t)
+
+            for di, det in enumerate(detections):
+                if di in matched_dets:
+                    continue
+                survivors.append(Track(
+                    track_id=self._next_id,
+                    label=det["class"],
+                    bbox=boxes[di].copy(),
+                    anchor=boxes[di].copy(),
+                    velocity=np.zeros(2, dtype=np.float32),
+                    confidence=det["confidence"],
+                    last_update=now,
+                ))
+                self._next_id += 1
+
+            self._tracks = survivors
+            self._frames_since_detection = 0
+            self._last_time = now
+            return [t.to_detection() for t in self._tracks if t.missed == 0]
+
+    @staticmethod
+    def _refresh(track: Track, det: dict, box: np.ndarray, now: float):
+        dt = now - track.last_update
+        if dt > 0 and track.anchor is not None:
+            old_c = (track.anchor[:2] + track.anchor[2:]) / 2
+            new_c = (box[:2] + box[2:]) / 2
+            track.velocity = 0.5 * track.velocity + 0.5 * (new_c - old_c) / dt
+        track.bbox = box.copy()
+        track.anchor = box.copy()
+        track.label = det["class"]
+        track.confidence = det["confidence"]
+        track.track_confidence = 1.0
+        track.hits += 1
+        track.missed = 0
+        track.last_update = now